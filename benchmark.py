@@ -0,0 +1,196 @@
+import json
+import os
+import sys
+import shutil
+import tempfile
+import threading
+import time
+import argparse
+import subprocess
+from functools import partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from syntheticGames import generate_league, publish_as_bucket
+
+# Benchmarks the download and processing paths against a synthetic league
+# (see syntheticGames.py), so regressions show up without S3 access.
+#
+#   download    dataExtractor.py pulling the gzipped league
+#               from a local HTTP stand-in for the bucket (S3_BUCKET_URL),
+#               directly and through a warm shared blob cache
+#   process     matchDetails4.py serially, with --workers and --vectorized,
+#               and serially with the standard library JSON backend
+#
+# Every case runs as a child process; wall time and peak RSS come from
+# os.wait4 for that child. The best of --repeat runs is reported. With
+# --baseline, a case more than --tolerance slower than the saved results
+# fails the run.
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+EXTRACTOR_SCRIPT = os.path.join(REPO_DIR, "dataExtractor.py")
+PROCESSOR_SCRIPT = os.path.join(REPO_DIR, "matchDetails4.py")
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_directory(directory):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(QuietHandler, directory=directory))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def run_measured(command, cwd, env=None):
+    with tempfile.TemporaryFile() as stderr_file:
+        start_time = time.perf_counter()
+        process = subprocess.Popen(command, cwd=cwd, env=env, stdout=subprocess.DEVNULL, stderr=stderr_file)
+        # wait4 reports the peak RSS of this child (and its waited-for workers) only
+        _, status, usage = os.wait4(process.pid, 0)
+        wall_time = time.perf_counter() - start_time
+        process.returncode = os.waitstatus_to_exitcode(status)
+        if process.returncode != 0:
+            stderr_file.seek(0)
+            raise RuntimeError(f"{' '.join(command)} exited with {process.returncode}:\n"
+                               f"{stderr_file.read().decode(errors='replace')}")
+    return {'wall_time': wall_time, 'peak_rss_mb': usage.ru_maxrss / 1024}
+
+
+def directory_size(directory, suffix=""):
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(directory) for name in names if name.endswith(suffix))
+
+
+def best_of(repeat, run):
+    results = [run() for _ in range(repeat)]
+    return min(results, key=lambda result: result['wall_time'])
+
+
+def benchmark_download(work_dir, bucket_dir, league, year, workers, events, repeat, cache_dir=None):
+    # Without cache_dir the shared blob cache is bypassed; with it, the cache is warmed before timing
+    server, url = serve_directory(bucket_dir)
+    # The extractor runs in the download directory and imports its modules from the repository root
+    env = dict(os.environ, S3_BUCKET_URL=url, PYTHONPATH=REPO_DIR)
+    games_dir = os.path.join(league, "games", str(year))
+    command = [sys.executable, EXTRACTOR_SCRIPT, '--league', league, '--year', str(year), '--workers', str(workers)]
+    command += ['--cache-dir', cache_dir] if cache_dir else ['--no-cache']
+
+    def run():
+        download_dir = tempfile.mkdtemp(dir=work_dir)
+        try:
+            result = run_measured(command, download_dir, env)
+            games = len([name for name in os.listdir(os.path.join(download_dir, games_dir)) if name.endswith(".json")])
+            result['games'] = games
+            result['bytes_out'] = directory_size(os.path.join(download_dir, games_dir), ".json")
+        finally:
+            shutil.rmtree(download_dir, ignore_errors=True)
+        return result
+
+    try:
+        if cache_dir:
+            run()
+        result = best_of(repeat, run)
+    finally:
+        server.shutdown()
+        server.server_close()
+    result['bytes_in'] = directory_size(os.path.join(bucket_dir, games_dir), ".json.gz")
+    result['games_per_sec'] = result['games'] / result['wall_time']
+    result['mb_per_sec'] = result['bytes_out'] / result['wall_time'] / 1e6
+    result['events_per_sec'] = events / result['wall_time']
+    return result
+
+
+def benchmark_processing(league_dir, league, year, workers, vectorized, events, repeat, json_backend=None):
+    # json_backend pins jsonBackend's decoder (e.g. "json" for the standard library)
+    env = dict(os.environ, VCT_JSON_BACKEND=json_backend) if json_backend else None
+    command = [sys.executable, PROCESSOR_SCRIPT, str(year), league, '--workers', str(workers)]
+    if vectorized:
+        command.append('--vectorized')
+
+    def run():
+        # Start cold every time: no outputs, columnar tables or catalog cache
+        shutil.rmtree(os.path.join(league_dir, "processedData"), ignore_errors=True)
+        shutil.rmtree(os.path.join(league_dir, league, "columnar"), ignore_errors=True)
+        catalog_cache = os.path.join(league_dir, league, "esports-data", "catalog.pickle")
+        if os.path.isfile(catalog_cache):
+            os.remove(catalog_cache)
+        return run_measured(command, league_dir, env)
+
+    result = best_of(repeat, run)
+    result['events_per_sec'] = events / result['wall_time']
+    return result
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get('results', {}).get(name)
+        if previous and result['wall_time'] > previous['wall_time'] * (1 + tolerance):
+            regressions.append(f"{name}: {result['wall_time']:.2f}s vs baseline {previous['wall_time']:.2f}s")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark downloads and game processing on a synthetic league.")
+    parser.add_argument('--games', type=int, default=20, help="Number of synthetic games (default: 20).")
+    parser.add_argument('--events-per-round', type=int, default=300, help="Average events per round (default: 300).")
+    parser.add_argument('--workers', type=int, default=4, help="Workers for the parallel cases (default: 4).")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per case; the fastest is reported (default: 3).")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--only', choices=['download', 'process'], help="Run only one group of cases.")
+    parser.add_argument('--work-dir', help="Directory for generated data (default: a temporary directory).")
+    parser.add_argument('--output', help="Write results as JSON to this file.")
+    parser.add_argument('--baseline', help="Fail if any case is slower than in this results file.")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Allowed slowdown against the baseline (default: 0.2).")
+    args = parser.parse_args()
+
+    league, year = "vct-international", 2024
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="vct-benchmark-")
+    league_dir = os.path.join(work_dir, "league")
+    bucket_dir = os.path.join(work_dir, "bucket")
+
+    try:
+        generated = generate_league(league_dir, league, year, args.games, events_per_round=args.events_per_round,
+                                    seed=args.seed)
+        events = generated['events']
+        print(f"Generated {len(generated['games'])} games, {events} events, "
+              f"{directory_size(os.path.join(league_dir, league, 'games')) / 1e6:.1f} MB")
+
+        cases = {}
+        if args.only in (None, 'download'):
+            publish_as_bucket(league_dir, league, year, bucket_dir)
+            cases['download serial'] = lambda: benchmark_download(work_dir, bucket_dir, league, year, 1, events, args.repeat)
+            cases[f'download workers={args.workers}'] = lambda: benchmark_download(work_dir, bucket_dir, league, year, args.workers, events, args.repeat)
+            cases['download cached'] = lambda: benchmark_download(work_dir, bucket_dir, league, year, args.workers, events, args.repeat,
+                                                                  os.path.join(work_dir, "blob-cache"))
+        if args.only in (None, 'process'):
+            cases['process serial'] = lambda: benchmark_processing(league_dir, league, year, 1, False, events, args.repeat)
+            cases[f'process workers={args.workers}'] = lambda: benchmark_processing(league_dir, league, year, args.workers, False, events, args.repeat)
+            cases['process vectorized'] = lambda: benchmark_processing(league_dir, league, year, 1, True, events, args.repeat)
+            cases['process serial json'] = lambda: benchmark_processing(league_dir, league, year, 1, False, events, args.repeat, 'json')
+
+        results = {}
+        for name, run in cases.items():
+            results[name] = run()
+            result = results[name]
+            print(f"{name:<24} {result['wall_time']:8.2f}s {result['events_per_sec']:>12,.0f} events/s "
+                  f"{result['peak_rss_mb']:8.1f} MB peak"
+                  + (f" {result['mb_per_sec']:8.1f} MB/s" if 'mb_per_sec' in result else ""))
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {'games': args.games, 'events': events, 'events_per_round': args.events_per_round,
+              'workers': args.workers, 'results': results}
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=4)
+
+    if args.baseline:
+        with open(args.baseline, "r") as baseline_file:
+            regressions = compare_to_baseline(results, json.load(baseline_file), args.tolerance)
+        if regressions:
+            print("Regressions against baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
@@ -0,0 +1,180 @@
+import fcntl
+import os
+import shutil
+import sqlite3
+import time
+import threading
+import argparse
+from contextlib import contextmanager
+
+# Host-wide, content-addressed cache of downloaded (decompressed) S3 objects,
+# shared by every checkout and league directory on the machine:
+#
+#   {cache_dir}/objects/{sha256[:2]}/{sha256}   blob files
+#   {cache_dir}/index.sqlite                    remote URL -> blob, blob sizes and last use
+#
+# The default directory lives under /var/tmp so every analyst on the host
+# shares it (VCT_BLOB_CACHE or --cache-dir point elsewhere). Directories are
+# created group-writable with setgid, so members of the owning group can all
+# add and evict blobs; chgrp the top directory to the team's group once.
+#
+# Blobs are read-only. Adopting a download copies it into the store (a
+# reflink where the filesystem supports one), so later edits to the league
+# file never reach the blob. A cache hit hard-links the blob into the league
+# tree, so a second analyst's run costs no network and no extra disk; the
+# linked league file is read-only too. Where the link is refused (another
+# filesystem, or fs.protected_hardlinks for a blob owned by another user),
+# the blob is copied instead. The extractor only ever replaces league files
+# atomically, so read-only files never get in its way.
+#
+# Only immutable objects (game files) belong in the cache: entries are never
+# revalidated against the bucket.
+# When the cache grows past max_bytes the least recently used blobs are
+# evicted; files already linked into league trees keep their own link.
+
+DEFAULT_CACHE_DIR = os.path.join("/var/tmp", "vct-esports-manager", "blobs")
+DEFAULT_MAX_BYTES = 50 * 1024 ** 3
+
+# Linux ioctl to share extents between files (btrfs, xfs)
+FICLONE = 0x40049409
+
+
+def make_shared_dirs(path):
+    # Create path and any missing parents as group-writable, setgid directories
+    if os.path.isdir(path):
+        return
+    make_shared_dirs(os.path.dirname(path))
+    try:
+        os.mkdir(path)
+    except FileExistsError:
+        return
+    os.chmod(path, 0o2775)
+
+
+def copy_into(source, temp_path):
+    # Reflink if the filesystem can share extents, else a plain copy
+    with open(source, "rb") as source_file, open(temp_path, "wb") as temp_file:
+        try:
+            fcntl.ioctl(temp_file.fileno(), FICLONE, source_file.fileno())
+        except OSError:
+            shutil.copyfileobj(source_file, temp_file)
+
+
+def link_or_copy(source, destination):
+    # Hard link if possible, else reflink, else a plain copy; always lands atomically
+    temp_path = f"{destination}.{os.getpid()}.{threading.get_ident()}.part"
+    try:
+        # PermissionError here is fs.protected_hardlinks refusing another user's blob
+        os.link(source, temp_path)
+    except OSError:
+        copy_into(source, temp_path)
+    os.replace(temp_path, destination)
+
+
+def copy_read_only(source, destination):
+    # A read-only copy of source that never shares its inode; lands atomically
+    temp_path = f"{destination}.{os.getpid()}.{threading.get_ident()}.part"
+    copy_into(source, temp_path)
+    os.chmod(temp_path, 0o444)
+    os.replace(temp_path, destination)
+
+
+class BlobCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.objects_dir = os.path.join(cache_dir, "objects")
+        make_shared_dirs(self.objects_dir)
+        self.index_path = os.path.join(cache_dir, "index.sqlite")
+        with self.index() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("CREATE TABLE IF NOT EXISTS blobs (sha256 TEXT PRIMARY KEY, size INTEGER NOT NULL, last_used REAL NOT NULL)")
+            connection.execute("CREATE TABLE IF NOT EXISTS keys (key TEXT PRIMARY KEY, sha256 TEXT NOT NULL, etag TEXT)")
+            connection.execute("CREATE INDEX IF NOT EXISTS blobs_last_used ON blobs (last_used)")
+        # SQLite gives the -wal and -shm files the index's mode, so the group can write all three
+        if os.stat(self.index_path).st_uid == os.getuid():
+            os.chmod(self.index_path, 0o664)
+
+    @contextmanager
+    def index(self):
+        # One short-lived connection per call: safe from any thread or process
+        connection = sqlite3.connect(self.index_path, timeout=60)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def blob_path(self, sha256):
+        return os.path.join(self.objects_dir, sha256[:2], sha256)
+
+    def lookup(self, key):
+        # (sha256, size, etag) for a cached key whose blob is still present, else None
+        with self.index() as connection:
+            row = connection.execute("SELECT keys.sha256, blobs.size, keys.etag FROM keys JOIN blobs USING (sha256) "
+                                     "WHERE key = ?", (key,)).fetchone()
+        if row is None or not os.path.isfile(self.blob_path(row[0])):
+            return None
+        return row
+
+    def fetch(self, key, destination):
+        # Link the cached object for `key` to `destination`; returns (sha256, size, etag) or None on a miss
+        entry = self.lookup(key)
+        if entry is None:
+            return None
+        try:
+            link_or_copy(self.blob_path(entry[0]), destination)
+        except FileNotFoundError:
+            # Evicted between lookup and link
+            return None
+        with self.index() as connection:
+            connection.execute("UPDATE blobs SET last_used = ? WHERE sha256 = ?", (time.time(), entry[0]))
+        return entry
+
+    def store(self, key, path, sha256, size, etag=None):
+        # Adopt a freshly downloaded file: copy it into the object store and index it under `key`
+        blob_path = self.blob_path(sha256)
+        if not os.path.isfile(blob_path):
+            make_shared_dirs(os.path.dirname(blob_path))
+            copy_read_only(path, blob_path)
+        with self.index() as connection:
+            connection.execute("INSERT INTO blobs (sha256, size, last_used) VALUES (?, ?, ?) "
+                               "ON CONFLICT (sha256) DO UPDATE SET last_used = excluded.last_used",
+                               (sha256, size, time.time()))
+            connection.execute("INSERT OR REPLACE INTO keys (key, sha256, etag) VALUES (?, ?, ?)", (key, sha256, etag))
+        self.evict()
+
+    def total_bytes(self):
+        with self.index() as connection:
+            return connection.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+
+    def evict(self, max_bytes=None):
+        # Drop least recently used blobs until the cache fits; returns the number evicted
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        evicted = 0
+        with self.index() as connection:
+            total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+            if total <= max_bytes:
+                return 0
+            for sha256, size in connection.execute("SELECT sha256, size FROM blobs ORDER BY last_used").fetchall():
+                if total <= max_bytes:
+                    break
+                connection.execute("DELETE FROM keys WHERE sha256 = ?", (sha256,))
+                connection.execute("DELETE FROM blobs WHERE sha256 = ?", (sha256,))
+                if os.path.isfile(self.blob_path(sha256)):
+                    os.remove(self.blob_path(sha256))
+                total -= size
+                evicted += 1
+        return evicted
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or trim the shared download cache.")
+    parser.add_argument('--cache-dir', default=os.getenv("VCT_BLOB_CACHE", DEFAULT_CACHE_DIR))
+    parser.add_argument('--max-gb', type=float, help="Evict least recently used blobs until the cache fits.")
+    args = parser.parse_args()
+
+    cache = BlobCache(args.cache_dir)
+    if args.max_gb is not None:
+        print(f"Evicted {cache.evict(int(args.max_gb * 1024 ** 3))} blobs")
+    print(f"{args.cache_dir}: {cache.total_bytes() / 1024 ** 3:.2f} GB")
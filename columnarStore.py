@@ -0,0 +1,245 @@
+import json
+import os
+import shutil
+import argparse
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import jsonBackend
+from gameEvents import iter_game_events, event_game_time
+from statCollectors import EventDispatcher
+
+# Converts each raw game file once into compact columnar tables, one per
+# event type, stored as one .npy file per column so analyses can memory-map
+# just the columns they need:
+#
+#   {event}/columnar/{year}/{game}/{table}.{column}.npy + meta.json
+#
+# Player ids are interned per game: every player column holds an int32
+# code into players.id (-1 when the id was missing). 'sequence' is the
+# event's position among ingested events, so tables can be merged back
+# into game order; 'round' is the latest roundStarted roundNumber (-1
+# before the first round).
+
+COLUMNAR_VERSION = 1
+MISSING = -1
+
+# kills.source values
+KILL_SOURCE_WEAPON = 0
+KILL_SOURCE_ABILITY = 1
+KILL_SOURCE_OTHER = 2
+
+# Column typecodes per table ('array' typecodes; saved with matching dtypes)
+TABLE_SCHEMAS = {
+    'rounds': {'sequence': 'q', 'round': 'i', 'game_time': 'd'},
+    'kills': {'sequence': 'q', 'round': 'i', 'game_time': 'd', 'killer': 'i', 'victim': 'i', 'source': 'b'},
+    'assists': {'kill': 'i', 'assistant': 'i'},
+    'damage': {'sequence': 'q', 'round': 'i', 'game_time': 'd', 'causer': 'i', 'victim': 'i', 'amount': 'd'},
+    'abilities': {'sequence': 'q', 'round': 'i', 'game_time': 'd', 'player': 'i'},
+    'configuration': {'sequence': 'q', 'player': 'i'},
+}
+
+
+class ColumnarIngestCollector:
+    def __init__(self):
+        self.columns = {table: {column: array(typecode) for column, typecode in schema.items()}
+                        for table, schema in TABLE_SCHEMAS.items()}
+        self.player_codes = {}
+        self.agent_guids = []
+        self.sequence = 0
+        self.current_round = MISSING
+        self.integer_damage = True
+
+    def handlers(self):
+        return {
+            'configuration': self.on_configuration,
+            'roundStarted': self.on_round_started,
+            'playerDied': self.on_player_died,
+            'damageEvent': self.on_damage,
+            'abilityUsed': self.on_ability_used,
+        }
+
+    def code(self, wrapped_id):
+        player_id = wrapped_id.get('value') if wrapped_id else None
+        if player_id is None:
+            return MISSING
+        code = self.player_codes.get(player_id)
+        if code is None:
+            code = self.player_codes[player_id] = len(self.player_codes)
+        return code
+
+    def next_sequence(self):
+        self.sequence += 1
+        return self.sequence - 1
+
+    def on_configuration(self, configuration, event):
+        columns = self.columns['configuration']
+        sequence = self.next_sequence()
+        for player in configuration.get('players', []):
+            columns['sequence'].append(sequence)
+            columns['player'].append(self.code(player.get('playerId')))
+            self.agent_guids.append(player.get('selectedAgent', {}).get('fallback', {}).get('guid', ''))
+
+    def on_round_started(self, round_started, event):
+        self.current_round = round_started.get('roundNumber', self.current_round)
+        columns = self.columns['rounds']
+        columns['sequence'].append(self.next_sequence())
+        columns['round'].append(self.current_round)
+        columns['game_time'].append(event_game_time(event))
+
+    def on_player_died(self, player_died, event):
+        columns = self.columns['kills']
+        kill_index = len(columns['sequence'])
+        columns['sequence'].append(self.next_sequence())
+        columns['round'].append(self.current_round)
+        columns['game_time'].append(event_game_time(event))
+        columns['killer'].append(self.code(player_died.get('killerId')))
+        columns['victim'].append(self.code(player_died.get('deceasedId')))
+        if 'weapon' in player_died:
+            columns['source'].append(KILL_SOURCE_WEAPON)
+        elif 'ability' in player_died:
+            columns['source'].append(KILL_SOURCE_ABILITY)
+        else:
+            columns['source'].append(KILL_SOURCE_OTHER)
+
+        assists = self.columns['assists']
+        for assistant in player_died.get('assistants', []):
+            assists['kill'].append(kill_index)
+            assists['assistant'].append(self.code(assistant.get('assistantId')))
+
+    def on_damage(self, damage_event, event):
+        columns = self.columns['damage']
+        amount = damage_event.get('damageAmount', 0)
+        if self.integer_damage and not isinstance(amount, int):
+            self.integer_damage = False
+        columns['sequence'].append(self.next_sequence())
+        columns['round'].append(self.current_round)
+        columns['game_time'].append(event_game_time(event))
+        columns['causer'].append(self.code(damage_event.get('causerId')))
+        columns['victim'].append(self.code(damage_event.get('victimId')))
+        columns['amount'].append(amount)
+
+    def on_ability_used(self, ability_used, event):
+        columns = self.columns['abilities']
+        columns['sequence'].append(self.next_sequence())
+        columns['round'].append(self.current_round)
+        columns['game_time'].append(event_game_time(event))
+        columns['player'].append(self.code(ability_used.get('playerId')))
+
+    def arrays(self):
+        tables = {table: {column: np.frombuffer(values, dtype=values.typecode) if len(values)
+                          else np.empty(0, dtype=values.typecode)
+                          for column, values in columns.items()}
+                  for table, columns in self.columns.items()}
+        # Keep damage integral when every amount was, so sums match the JSON path
+        if self.integer_damage:
+            tables['damage']['amount'] = tables['damage']['amount'].astype(np.int64)
+        tables['configuration']['agent_guid'] = np.array(self.agent_guids, dtype=str)
+
+        player_ids = list(self.player_codes)
+        if all(isinstance(player_id, int) for player_id in player_ids):
+            tables['players'] = {'id': np.array(player_ids, dtype=np.int64)}
+        else:
+            tables['players'] = {'id': np.array([str(player_id) for player_id in player_ids], dtype=str)}
+        return tables
+
+
+def source_fingerprint(path):
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def convert_game(game_path, game_dir):
+    collector = ColumnarIngestCollector()
+    EventDispatcher([collector]).run(iter_game_events(game_path))
+    tables = collector.arrays()
+
+    # Write into a temp directory and swap it in so readers never see half a game
+    temp_dir = f"{game_dir}.part"
+    shutil.rmtree(temp_dir, ignore_errors=True)
+    os.makedirs(temp_dir)
+    rows = {}
+    for table, columns in tables.items():
+        for column, values in columns.items():
+            np.save(os.path.join(temp_dir, f"{table}.{column}.npy"), values)
+            rows[table] = len(values)
+    meta = {'version': COLUMNAR_VERSION, 'source': source_fingerprint(game_path), 'rows': rows,
+            'columns': {table: list(columns) for table, columns in tables.items()}}
+    with open(os.path.join(temp_dir, "meta.json"), "w") as meta_file:
+        json.dump(meta, meta_file)
+
+    shutil.rmtree(game_dir, ignore_errors=True)
+    os.replace(temp_dir, game_dir)
+    return game_dir
+
+
+def is_converted(game_path, game_dir):
+    meta_path = os.path.join(game_dir, "meta.json")
+    if not os.path.isfile(meta_path):
+        return False
+    with open(meta_path, "r") as meta_file:
+        meta = jsonBackend.load(meta_file)
+    return meta.get('version') == COLUMNAR_VERSION and meta.get('source') == source_fingerprint(game_path)
+
+
+class ColumnarGame:
+    # Read-only view of one converted game; columns are memory-mapped on first use
+    def __init__(self, game_dir):
+        self.game_dir = game_dir
+        with open(os.path.join(game_dir, "meta.json"), "r") as meta_file:
+            self.meta = jsonBackend.load(meta_file)
+        self.loaded = {}
+
+    def rows(self, table):
+        return self.meta['rows'].get(table, 0)
+
+    def column(self, table, column):
+        key = (table, column)
+        if key not in self.loaded:
+            path = os.path.join(self.game_dir, f"{table}.{column}.npy")
+            # Empty files cannot be memory-mapped
+            self.loaded[key] = np.load(path, mmap_mode='r' if self.rows(table) else None)
+        return self.loaded[key]
+
+    def table(self, table, columns=None):
+        if columns is None:
+            columns = self.meta['columns'][table]
+        return {column: self.column(table, column) for column in columns}
+
+    @property
+    def player_ids(self):
+        return self.column('players', 'id')
+
+
+def columnar_dir(event, year):
+    return f"{event}/columnar/{year}"
+
+
+def convert_if_needed(args):
+    game_path, game_dir = args
+    if is_converted(game_path, game_dir):
+        return game_dir, False
+    return convert_game(game_path, game_dir), True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert a league-year's raw game files into columnar tables.")
+    parser.add_argument('year', help="Example: 2024")
+    parser.add_argument('event', help="Example: vct-international")
+    parser.add_argument('--workers', type=int, default=1, help="Number of games converted in parallel (default: 1).")
+    args = parser.parse_args()
+
+    games_dir = f"{args.event}/games/{args.year}"
+    output_dir = columnar_dir(args.event, args.year)
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = [(os.path.join(games_dir, game_file), os.path.join(output_dir, os.path.splitext(game_file)[0]))
+            for game_file in sorted(os.listdir(games_dir)) if game_file.endswith(".json")]
+
+    if args.workers > 1:
+        with ProcessPoolExecutor(args.workers) as executor:
+            results = list(executor.map(convert_if_needed, jobs))
+    else:
+        results = [convert_if_needed(job) for job in jobs]
+
+    converted = sum(1 for _, was_converted in results if was_converted)
+    print(f"Converted {converted} of {len(jobs)} games into {output_dir}")
@@ -0,0 +1,235 @@
+import json
+import os
+import time
+import argparse
+import tracemalloc
+from array import array
+from gameEvents import iter_game_events, event_game_time
+from roundIndex import IndexedGame
+from statCollectors import EventDispatcher
+from referenceCatalog import ReferenceCatalog
+from columnarStore import ColumnarIngestCollector, TABLE_SCHEMAS, MISSING
+
+# Compact in-memory event model for holding a whole league-year at once.
+#
+# Events are kept as the columnar tables of columnarStore (one typed array
+# per column, per event type), extended with round ends, agents, teams and
+# kill weapons. Player, team, agent and weapon ids are interned season-wide,
+# so every id column is a small integer code. In-game player ids (1..10) and
+# team ids are resolved to esports ids through the game's mapping data first,
+# so a code means the same player or team in every game; ids without a
+# mapping are interned as (platformGameId, id). Iterating a table yields
+# __slots__ records built on the fly; nothing per event stays as a dict.
+#
+# Fields that are not kept (positions, locations, assistants' details, ...)
+# are available lazily: CompactGame.event(sequence) decodes that event's
+# round from the game file through its round index (roundIndex.py).
+
+COMPACT_SCHEMAS = dict(TABLE_SCHEMAS)
+COMPACT_SCHEMAS['kills'] = dict(TABLE_SCHEMAS['kills'], weapon='i')
+COMPACT_SCHEMAS['configuration'] = dict(TABLE_SCHEMAS['configuration'], agent='h', team='i')
+COMPACT_SCHEMAS['round_ends'] = {'sequence': 'q', 'round': 'i', 'game_time': 'd', 'winner': 'i'}
+
+
+class Interner:
+    __slots__ = ('codes', 'values')
+
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+
+    def code(self, value):
+        if value is None:
+            return MISSING
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def __getitem__(self, code):
+        return self.values[code] if code != MISSING else None
+
+    def __len__(self):
+        return len(self.values)
+
+
+class EventRecord:
+    __slots__ = ()
+
+    def __init__(self, *values):
+        for field, value in zip(self.__slots__, values):
+            setattr(self, field, value)
+
+    def __repr__(self):
+        fields = ", ".join(f"{field}={getattr(self, field)!r}" for field in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+# One record class per table, e.g. KillsRecord(sequence, round, game_time, killer, ...)
+RECORD_TYPES = {table: type(f"{table.title().replace('_', '')}Record", (EventRecord,), {'__slots__': tuple(schema)})
+                for table, schema in COMPACT_SCHEMAS.items()}
+
+
+class CompactIngestCollector(ColumnarIngestCollector):
+    def __init__(self, season, game_id):
+        super().__init__()
+        self.season = season
+        self.game_id = game_id
+        game_mappings = season.catalog.game(game_id) if season.catalog is not None else None
+        self.participants = (game_mappings or {}).get('participantMapping', {})
+        self.game_teams = (game_mappings or {}).get('teamMapping', {})
+        self.columns = {table: {column: array(typecode) for column, typecode in schema.items()}
+                        for table, schema in COMPACT_SCHEMAS.items()}
+        # File position (index in the game's event array) of every ingested event, by sequence
+        self.positions = array('i')
+        self.position = 0
+
+    def handlers(self):
+        return dict(super().handlers(), roundEnded=self.on_round_ended)
+
+    def code(self, wrapped_id):
+        return self.season.players.code(self.season_id(wrapped_id.get('value') if wrapped_id else None, self.participants))
+
+    def team_code(self, team_id):
+        return self.season.teams.code(self.season_id(team_id, self.game_teams))
+
+    def season_id(self, in_game_id, mapping):
+        # The esports id behind an in-game id, else the id qualified by its game
+        if in_game_id is None:
+            return None
+        esports_id = mapping.get(str(in_game_id))
+        return esports_id if esports_id is not None else (self.game_id, in_game_id)
+
+    def next_sequence(self):
+        self.positions.append(self.position)
+        return super().next_sequence()
+
+    def on_configuration(self, configuration, event):
+        team_of = {}
+        for team in configuration.get('teams', []):
+            team_id = team.get('teamId', {}).get('value')
+            for member in team.get('playersInTeam', []):
+                team_of[member.get('value')] = team_id
+
+        super().on_configuration(configuration, event)
+        columns = self.columns['configuration']
+        for player, agent_guid in zip(configuration.get('players', []), self.agent_guids):
+            columns['agent'].append(self.season.agents.code(agent_guid or None))
+            columns['team'].append(self.team_code(team_of.get(player.get('playerId', {}).get('value'))))
+        self.agent_guids.clear()
+
+    def on_player_died(self, player_died, event):
+        super().on_player_died(player_died, event)
+        weapon = player_died.get('weapon', {}).get('fallback', {}).get('guid')
+        self.columns['kills']['weapon'].append(self.season.weapons.code(weapon))
+
+    def on_round_ended(self, round_ended, event):
+        columns = self.columns['round_ends']
+        columns['sequence'].append(self.next_sequence())
+        columns['round'].append(round_ended.get('roundNumber', self.current_round))
+        columns['game_time'].append(event_game_time(event))
+        columns['winner'].append(self.team_code(round_ended.get('winningTeam', {}).get('value')))
+
+    def ingest(self, path):
+        def positioned(events):
+            for position, event in enumerate(events):
+                self.position = position
+                yield event
+        EventDispatcher([self]).run(positioned(iter_game_events(path)))
+
+
+class CompactGame:
+    __slots__ = ('season', 'path', 'game_id', 'tables', 'positions', 'indexed_game')
+
+    def __init__(self, season, path, game_id, tables, positions):
+        self.season = season
+        self.path = path
+        self.game_id = game_id
+        self.tables = tables
+        self.positions = positions
+        # Opened (and its round index read) on the first event() call
+        self.indexed_game = None
+
+    def rows(self, table):
+        return len(self.tables[table]['sequence' if table != 'assists' else 'kill'])
+
+    def column(self, table, column):
+        return self.tables[table][column]
+
+    def records(self, table):
+        record_type = RECORD_TYPES[table]
+        return (record_type(*values) for values in zip(*self.tables[table].values()))
+
+    def record(self, table, index):
+        return RECORD_TYPES[table](*(values[index] for values in self.tables[table].values()))
+
+    def event(self, sequence):
+        # The full original event, decoded on demand from its round of the game file
+        if self.indexed_game is None:
+            self.indexed_game = IndexedGame(self.path)
+        return self.indexed_game.event(self.positions[sequence])
+
+    def nbytes(self):
+        return sum(values.itemsize * len(values) for columns in self.tables.values() for values in columns.values()) \
+            + self.positions.itemsize * len(self.positions)
+
+
+class CompactSeason:
+    def __init__(self, catalog=None):
+        self.catalog = catalog
+        self.players = Interner()
+        self.teams = Interner()
+        self.agents = Interner()
+        self.weapons = Interner()
+        self.games = {}
+
+    def add_game(self, path):
+        game_file = os.path.basename(path)
+        game_id = f"val:{game_file.split('_')[1].replace('.json', '')}"
+        collector = CompactIngestCollector(self, game_id)
+        collector.ingest(path)
+        self.games[game_id] = CompactGame(self, path, game_id, collector.columns, collector.positions)
+        return self.games[game_id]
+
+    @classmethod
+    def load(cls, event, year):
+        season = cls(ReferenceCatalog.load(event))
+        games_dir = f"{event}/games/{year}"
+        for game_file in sorted(os.listdir(games_dir)):
+            if game_file.endswith(".json"):
+                season.add_game(os.path.join(games_dir, game_file))
+        return season
+
+    def events(self):
+        return sum(len(game.positions) for game in self.games.values())
+
+    def nbytes(self):
+        return sum(game.nbytes() for game in self.games.values())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load a league-year into the compact event model and report its footprint.")
+    parser.add_argument('year', help="Example: 2024")
+    parser.add_argument('event', help="Example: vct-international")
+    parser.add_argument('--compare', action='store_true',
+                        help="Also measure the same games loaded with json.load (slow, needs the memory).")
+    args = parser.parse_args()
+
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    season = CompactSeason.load(args.event, args.year)
+    elapsed = time.perf_counter() - start_time
+    compact_bytes = tracemalloc.get_traced_memory()[0]
+    print(f"{len(season.games)} games, {season.events()} events in {elapsed:.2f}s: {compact_bytes / 1e6:.1f} MB "
+          f"({season.nbytes() / 1e6:.1f} MB of columns; {len(season.players)} players, {len(season.teams)} teams, "
+          f"{len(season.agents)} agents interned)")
+
+    if args.compare:
+        before = tracemalloc.get_traced_memory()[0]
+        loaded = []
+        for game in season.games.values():
+            with open(game.path, "r", encoding="utf-8") as game_file:
+                loaded.append(json.load(game_file))
+        dict_bytes = tracemalloc.get_traced_memory()[0] - before
+        print(f"json.load: {dict_bytes / 1e6:.1f} MB ({dict_bytes / max(compact_bytes, 1):.1f}x)")
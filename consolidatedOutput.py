@@ -0,0 +1,162 @@
+import json
+import os
+import argparse
+import pandas as pd
+import jsonBackend
+
+# Consolidated, append-only alternative to one pretty-printed JSON file per
+# game. Each league-year is a partition of JSON-lines part files:
+#
+#   {output_directory}/consolidated/{league}/{year}/part-00000.jsonl
+#
+# and every line is one game: {"game": "val:...", "rows": [player rows]}.
+# Lines are only ever appended, in batches; reprocessing a game appends a
+# new line and the loader keeps the last one per game. A part is closed
+# once it passes PART_MAX_BYTES and the next one is started.
+
+CONSOLIDATED_DIRECTORY = "consolidated"
+PART_MAX_BYTES = 64 * 1024 * 1024
+BATCH_GAMES = 50
+
+
+def partition_dir(output_directory, league, year):
+    return os.path.join(output_directory, CONSOLIDATED_DIRECTORY, league, str(year))
+
+
+def part_files(directory):
+    if not os.path.isdir(directory):
+        return []
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                  if name.startswith("part-") and name.endswith(".jsonl"))
+
+
+def game_line(game_id, rows_json):
+    # rows_json is the already-serialised records array (e.g. DataFrame.to_json(orient="records"))
+    return f'{{"game":{json.dumps(game_id)},"rows":{rows_json}}}\n'
+
+
+def drop_torn_tail(path):
+    # Cut a line left unfinished by a killed run so the next append starts on a fresh line
+    with open(path, "rb+") as part_file:
+        size = part_file.seek(0, os.SEEK_END)
+        if size == 0:
+            return
+        part_file.seek(size - 1)
+        if part_file.read(1) == b"\n":
+            return
+        position = size
+        while position > 0:
+            step = min(position, 64 * 1024)
+            part_file.seek(position - step)
+            newline = part_file.read(step).rfind(b"\n")
+            if newline != -1:
+                part_file.truncate(position - step + newline + 1)
+                return
+            position -= step
+        part_file.truncate(0)
+
+
+class ConsolidatedWriter:
+    def __init__(self, output_directory, league, year, batch_games=BATCH_GAMES, part_max_bytes=PART_MAX_BYTES):
+        self.directory = partition_dir(output_directory, league, year)
+        os.makedirs(self.directory, exist_ok=True)
+        self.batch_games = batch_games
+        self.part_max_bytes = part_max_bytes
+        self.pending = []
+        parts = part_files(self.directory)
+        self.part_number = int(os.path.basename(parts[-1])[5:10]) if parts else 0
+        if parts:
+            drop_torn_tail(parts[-1])
+
+    def part_path(self):
+        return os.path.join(self.directory, f"part-{self.part_number:05d}.jsonl")
+
+    def add(self, game_id, rows_json):
+        self.pending.append(game_line(game_id, rows_json))
+        if len(self.pending) >= self.batch_games:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        path = self.part_path()
+        if os.path.isfile(path) and os.path.getsize(path) >= self.part_max_bytes:
+            self.part_number += 1
+            path = self.part_path()
+        with open(path, "a", encoding="utf-8") as part_file:
+            part_file.write("".join(self.pending))
+            part_file.flush()
+            os.fsync(part_file.fileno())
+        self.pending = []
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def iter_game_records(output_directory, league, year):
+    # Yields (game_id, rows) for every line, oldest first
+    for path in part_files(partition_dir(output_directory, league, year)):
+        with open(path, "r", encoding="utf-8") as part_file:
+            for line in part_file:
+                try:
+                    record = jsonBackend.loads(line)
+                except json.JSONDecodeError:
+                    # A run killed mid-append leaves at most one torn line at the end of a part
+                    continue
+                yield record['game'], record['rows']
+
+
+def load_games(output_directory, league, year):
+    # {game_id: rows}, keeping the latest line written for each game
+    games = {}
+    for game_id, rows in iter_game_records(output_directory, league, year):
+        games[game_id] = rows
+    return games
+
+
+def load_season(output_directory, league, year):
+    # Every player row of the league-year in one DataFrame, with a 'game' column
+    rows = [dict(row, game=game_id) for game_id, game_rows in load_games(output_directory, league, year).items()
+            for row in game_rows]
+    return pd.DataFrame(rows)
+
+
+def compact(output_directory, league, year):
+    # Rewrite the partition with one line per game, dropping superseded lines
+    directory = partition_dir(output_directory, league, year)
+    games = load_games(output_directory, league, year)
+    old_parts = part_files(directory)
+    # The compacted part sorts after every old one, so a crash before the
+    # old parts are removed still loads the right rows
+    next_number = int(os.path.basename(old_parts[-1])[5:10]) + 1 if old_parts else 0
+    temp_path = os.path.join(directory, "compact.part")
+    with open(temp_path, "w", encoding="utf-8") as part_file:
+        for game_id, rows in games.items():
+            part_file.write(game_line(game_id, json.dumps(rows, separators=(',', ':'))))
+        part_file.flush()
+        os.fsync(part_file.fileno())
+    os.replace(temp_path, os.path.join(directory, f"part-{next_number:05d}.jsonl"))
+    for path in old_parts:
+        os.remove(path)
+    return len(games)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or compact a consolidated league-year of processed stats.")
+    parser.add_argument('year', help="Example: 2024")
+    parser.add_argument('event', help="Example: vct-international")
+    parser.add_argument('--output-directory', default="processedData")
+    parser.add_argument('--compact', action='store_true', help="Rewrite the partition keeping only the latest line per game.")
+    args = parser.parse_args()
+
+    if args.compact:
+        print(f"Compacted {compact(args.output_directory, args.event, args.year)} games")
+    season = load_season(args.output_directory, args.event, args.year)
+    games = season['game'].nunique() if len(season) else 0
+    print(f"{games} games, {len(season)} player rows in {partition_dir(args.output_directory, args.event, args.year)}")
@@ -1,77 +1,497 @@
 import requests
+import urllib3
 import json
-import gzip
-import shutil
+import zlib
+import hashlib
+import sqlite3
 import time
 import os
-from io import BytesIO
+import threading
+import argparse
+from itertools import chain
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from requests.adapters import HTTPAdapter
+import jsonBackend
+from pipelineMetrics import PipelineMetrics
+from blobCache import BlobCache, DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES
 
-S3_BUCKET_URL = "https://vcthackathon-data.s3.us-west-2.amazonaws.com"
+# S3_BUCKET_URL in the environment (or a .env file, via "Data Extraction/dataExtractor.py") points elsewhere
+S3_BUCKET_URL = os.getenv("S3_BUCKET_URL", "https://vcthackathon-data.s3.us-west-2.amazonaws.com")
 
+# Defaults for --league, --year and --workers
 # (game-changers, vct-international, vct-challengers)
 LEAGUE = "vct-challengers"
 
 # (2022, 2023, 2024)
 YEAR = 2024
-def download_gzip_and_write_to_json(file_name):
-    actual_file = file_name.replace(":", "_")
-    if os.path.isfile(f"{actual_file}.json"):
+
+# Number of games downloaded in parallel (1 = old sequential behaviour)
+WORKERS = 8
+
+# Per-request timeout in seconds and retry policy for 5xx responses / timeouts
+REQUEST_TIMEOUT = 60
+MAX_RETRIES = 5
+BACKOFF_FACTOR = 1.0
+
+# Streaming decompression settings
+CHUNK_SIZE = 1024 * 1024
+GZIP_MAGIC = b"\x1f\x8b"
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+# Per-league record of completed downloads, saved every MANIFEST_SAVE_INTERVAL games.
+# With VERIFY_CHECKSUMS on, finished files are re-hashed before being trusted.
+MANIFEST_FILE = "manifest.json"
+MANIFEST_SAVE_INTERVAL = 50
+VERIFY_CHECKSUMS = False
+
+# Host-wide content-addressed cache of downloaded game files, shared by every checkout on the machine
+# (set BLOB_CACHE_DIR to None to download everything directly)
+BLOB_CACHE_DIR = os.getenv("VCT_BLOB_CACHE", DEFAULT_CACHE_DIR)
+BLOB_CACHE_MAX_BYTES = int(os.getenv("VCT_BLOB_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+
+# Each worker thread keeps its own keep-alive session
+thread_local = threading.local()
+manifest_lock = threading.Lock()
+
+# Stage metrics shared by all download threads
+metrics = PipelineMetrics()
+
+# Opened on first use so importing the module never touches the cache directory
+blob_cache = None
+blob_cache_lock = threading.Lock()
+
+
+def get_blob_cache():
+    global blob_cache
+    if BLOB_CACHE_DIR is None:
+        return None
+    with blob_cache_lock:
+        if blob_cache is None:
+            blob_cache = BlobCache(BLOB_CACHE_DIR, BLOB_CACHE_MAX_BYTES)
+    return blob_cache
+
+
+def get_session():
+    session = getattr(thread_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        thread_local.session = session
+    return session
+
+
+def get_with_retries(url, method="GET"):
+    # Retry on server errors and network failures with exponential backoff
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            response = get_session().request(method, url, stream=True, timeout=REQUEST_TIMEOUT)
+            if response.status_code < 500:
+                return response
+            response.close()
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            if attempt == MAX_RETRIES:
+                raise
+        if attempt < MAX_RETRIES:
+            time.sleep(BACKOFF_FACTOR * (2 ** attempt))
+    return response
+
+
+class ChecksumWriter:
+    # File wrapper that hashes and counts everything written through it
+    def __init__(self, output_file):
+        self.output_file = output_file
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data):
+        self.sha256.update(data)
+        self.size += len(data)
+        self.output_file.write(data)
+
+
+def load_manifest(league):
+    manifest_path = f"{league}/{MANIFEST_FILE}"
+    if not os.path.isfile(manifest_path):
+        return {}
+    with open(manifest_path, "r") as manifest_file:
+        return jsonBackend.load(manifest_file)
+
+
+def save_manifest(league, manifest):
+    manifest_path = f"{league}/{MANIFEST_FILE}"
+    with manifest_lock:
+        contents = json.dumps(manifest, indent=2, sort_keys=True)
+    write_file_atomically(manifest_path, contents.encode())
+
+
+def write_file_atomically(path, data):
+    temp_path = f"{path}.part"
+    with open(temp_path, "wb") as temp_file:
+        temp_file.write(data)
+        temp_file.flush()
+        os.fsync(temp_file.fileno())
+    os.replace(temp_path, path)
+
+
+def file_sha256(path):
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as local_file:
+        for block in iter(lambda: local_file.read(CHUNK_SIZE), b""):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+def ends_like_json_array(path):
+    # Cheap completeness check for game files downloaded before the manifest existed.
+    # Game files are one top-level array; a file cut short after an inner "}" is not trusted.
+    with open(path, "rb") as local_file:
+        local_file.seek(max(os.path.getsize(path) - 64, 0))
+        tail = local_file.read().rstrip()
+    return tail.endswith(b"]")
+
+
+def is_downloaded(local_file, manifest):
+    if not os.path.isfile(local_file):
+        return False
+    if manifest is None:
+        return True
+
+    entry = manifest.get(local_file)
+    if entry is None:
+        if not ends_like_json_array(local_file):
+            return False
+        with manifest_lock:
+            manifest[local_file] = {"size": os.path.getsize(local_file), "etag": None,
+                                    "sha256": None, "status": "complete"}
+        return True
+
+    if entry.get("status") != "complete" or os.path.getsize(local_file) != entry["size"]:
+        return False
+    if VERIFY_CHECKSUMS and entry.get("sha256") and file_sha256(local_file) != entry["sha256"]:
+        return False
+    return True
+
+
+def timed_decompress(decompressor, chunk):
+    start = time.perf_counter()
+    data = decompressor.decompress(chunk, CHUNK_SIZE)
+    metrics.add('decompress', time.perf_counter() - start, len(data))
+    return data
+
+
+def timed_write(output_file, data):
+    with metrics.timed('write', len(data)):
+        output_file.write(data)
+
+
+def stream_response_to_file(response, output_file, body_md5=None):
+    # Decode the body chunk by chunk so memory stays bounded by CHUNK_SIZE,
+    # falling back to raw bytes for objects that are not gzipped
+    # Read the body as stored, without requests undoing a Content-Encoding: gzip,
+    # so body_md5 sees the bytes the ETag was computed over
+    chunks = metrics.timed_iter('download', response.raw.stream(CHUNK_SIZE, decode_content=False), size=len)
+    if body_md5 is not None:
+        chunks = hash_chunks(chunks, body_md5)
+    first_chunk = next(chunks, b"")
+    if first_chunk[:2] != GZIP_MAGIC:
+        for chunk in chain([first_chunk], chunks):
+            timed_write(output_file, chunk)
+        return "raw"
+
+    decompressor = zlib.decompressobj(GZIP_WBITS)
+    member_open = False
+    for chunk in chain([first_chunk], chunks):
+        while chunk:
+            member_open = True
+            timed_write(output_file, timed_decompress(decompressor, chunk))
+            if decompressor.eof:
+                # Concatenated gzip members continue in unused_data
+                chunk = decompressor.unused_data
+                decompressor = zlib.decompressobj(GZIP_WBITS)
+                member_open = False
+            else:
+                chunk = decompressor.unconsumed_tail
+    if member_open:
+        timed_write(output_file, decompressor.flush())
+        if not decompressor.eof:
+            raise EOFError(f"Truncated gzip stream from {response.url}")
+    return "gzip"
+
+
+def hash_chunks(chunks, body_hash):
+    for chunk in chunks:
+        body_hash.update(chunk)
+        yield chunk
+
+
+def store_in_cache(cache, remote_file, local_file, writer, etag):
+    # A cache problem never fails the download itself
+    if cache is None:
+        return
+    try:
+        cache.store(remote_file, local_file, writer.sha256.hexdigest(), writer.size, etag or None)
+    except (OSError, sqlite3.Error) as error:
+        print(f"Could not cache {local_file}: {error}")
+
+
+def mark_failed(manifest, local_file, etag=None):
+    if manifest is not None:
+        with manifest_lock:
+            manifest[local_file] = {"size": None, "etag": etag or None, "sha256": None, "status": "failed"}
+
+
+def local_name(file_name):
+    # Local path of a remote object; platform game ids contain ':', which local names replace with '_'
+    return f"{file_name.replace(':', '_')}.json"
+
+
+def download_gzip_and_write_to_json(file_name, manifest=None, use_cache=True):
+    local_file = local_name(file_name)
+    if is_downloaded(local_file, manifest):
         return False
 
     remote_file = f"{S3_BUCKET_URL}/{file_name}.json.gz"
-    response = requests.get(remote_file, stream=True)
+
+    # Another checkout may already have fetched this object
+    cache = get_blob_cache() if use_cache else None
+    if cache is not None:
+        try:
+            with metrics.timed('cache_link', items=1):
+                cached = cache.fetch(remote_file, local_file)
+        except (OSError, sqlite3.Error) as error:
+            print(f"Could not read {local_file} from the cache: {error}")
+            cached = None
+        if cached is not None:
+            sha256, size, etag = cached
+            if manifest is not None:
+                with manifest_lock:
+                    manifest[local_file] = {"size": size, "etag": etag, "sha256": sha256, "status": "complete"}
+            print(f"{local_file} linked from cache")
+            return True
+
+    try:
+        with metrics.timed('request', items=1):
+            response = get_with_retries(remote_file)
+    except requests.exceptions.RequestException as error:
+        # Retries exhausted; the run carries on with the other games
+        mark_failed(manifest, local_file)
+        print(f"Failed to download {file_name}: {error}")
+        return False
 
     if response.status_code == 200:
+        # Write to a temp path and rename so a partial file never looks finished
+        temp_file = f"{local_file}.part"
+        body_md5 = hashlib.md5()
+        etag = response.headers.get("ETag", "").strip('"')
         try:
-            # Try decoding as gzip first
-            gzip_bytes = BytesIO(response.content)
-            with gzip.GzipFile(fileobj=gzip_bytes, mode="rb") as gzipped_file:
-                with open(f"{actual_file}.json", 'wb') as output_file:
-                    shutil.copyfileobj(gzipped_file, output_file)
-            print(f"{actual_file}.json written (gzip)")
-        except (gzip.BadGzipFile,):
-            # If decoding as gzip fails, try as raw bytes
-            with open(f"{actual_file}.json", 'wb') as output_file:
-                output_file.write(response.content)
-            print(f"{actual_file}.json written (raw)")
+            with open(temp_file, 'wb') as output_file:
+                writer = ChecksumWriter(output_file)
+                encoding = stream_response_to_file(response, writer, body_md5)
+                with metrics.timed('fsync'):
+                    output_file.flush()
+                    os.fsync(output_file.fileno())
+            # Single-part S3 ETags are the MD5 of the stored object; multipart ETags
+            # ("<md5 of part md5s>-<parts>") cannot be checked against the body
+            if len(etag) == 32 and "-" not in etag and etag != body_md5.hexdigest():
+                raise ValueError(f"ETag mismatch for {remote_file}")
+            os.replace(temp_file, local_file)
+        except (requests.exceptions.RequestException, urllib3.exceptions.HTTPError, EOFError, zlib.error,
+                ValueError) as error:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+            mark_failed(manifest, local_file, etag)
+            print(f"Failed to download {file_name}: {error}")
+            return False
+
+        if manifest is not None:
+            with manifest_lock:
+                manifest[local_file] = {"size": writer.size, "etag": etag or None,
+                                        "sha256": writer.sha256.hexdigest(), "status": "complete"}
+        store_in_cache(cache, remote_file, local_file, writer, etag)
+        print(f"{local_file} written ({encoding})")
         return True
-def download_esports_files():
-    directory = f"{LEAGUE}/esports-data"
+    if response.status_code != 404:
+        print(f"Failed to download {file_name}: HTTP {response.status_code}")
+    response.close()
+    return False
+
+
+def download_esports_files(league=LEAGUE):
+    directory = f"{league}/esports-data"
 
     if not os.path.exists(directory):
         os.makedirs(directory)
 
+    manifest = load_manifest(league)
     esports_data_files = ["leagues", "tournaments",
                           "players", "teams", "mapping_data"]
     for file_name in esports_data_files:
-        download_gzip_and_write_to_json(f"{directory}/{file_name}")
+        # Reference data changes upstream, so it is never served from the shared cache
+        download_gzip_and_write_to_json(f"{directory}/{file_name}", manifest, use_cache=False)
+    save_manifest(league, manifest)
+
+
+def load_reference(league, name):
+    # One of the downloaded reference data files, or None if it is missing
+    local_file = f"{league}/esports-data/{name}.json"
+    if not os.path.exists(local_file):
+        print(f"{name} data not found for {league}")
+        return None
+    with open(local_file, "r") as json_file:
+        return jsonBackend.load(json_file)
+
+
+def resolve_ids(records, wanted, kind, fields):
+    # Ids of the records whose id, name, acronym or slug (`fields`) matches one of `wanted`
+    wanted = {value.lower(): value for value in wanted}
+    ids = set()
+    matched = set()
+    for record in records:
+        for field in fields:
+            value = str(record.get(field, "")).lower()
+            if value in wanted:
+                ids.add(record.get('id'))
+                matched.add(value)
+    for value in wanted.keys() - matched:
+        print(f"No {kind} matches '{wanted[value]}'")
+    return ids
+
+
+def select_games(league, tournaments=None, teams=None):
+    # The league's mapping data, narrowed to the given tournaments and teams (None if missing)
+    mappings_data = load_reference(league, "mapping_data")
+    if mappings_data is None:
+        return None
+    if tournaments:
+        tournament_ids = resolve_ids(load_reference(league, "tournaments") or [], tournaments, "tournament", ("id", "name"))
+        mappings_data = [game for game in mappings_data if game.get('tournamentId') in tournament_ids]
+    if teams:
+        team_ids = resolve_ids(load_reference(league, "teams") or [], teams, "team", ("id", "name", "acronym", "slug"))
+        mappings_data = [game for game in mappings_data if team_ids & set(game.get('teamMapping', {}).values())]
+    return mappings_data
+
+
+def year_range(value):
+    # "2024" or an inclusive range such as "2022-2024"
+    first, _, last = value.partition("-")
+    try:
+        first, last = int(first), int(last or first)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected a year or a range like 2022-2024, got '{value}'")
+    return list(range(first, last + 1))
+
 
+def remote_size(s3_game_file):
+    # Compressed size from a HEAD request, or None if the object does not exist
+    response = get_with_retries(f"{S3_BUCKET_URL}/{s3_game_file}.json.gz", method="HEAD")
+    response.close()
+    if response.status_code != 200:
+        return None
+    return int(response.headers.get("Content-Length", 0))
 
-def download_games():
+
+def dry_run_games(league, year, mappings_data, workers=1):
+    # Report what download_games would fetch, sending only HEAD requests
+    manifest = load_manifest(league)
+    s3_game_files = [f"{league}/games/{year}/{esports_game['platformGameId']}" for esports_game in mappings_data]
+    missing = [s3_game_file for s3_game_file in s3_game_files
+               if not is_downloaded(local_name(s3_game_file), manifest)]
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        sizes = [size for size in executor.map(remote_size, missing) if size is not None]
+    print(f"{league} {year}: would fetch {len(sizes)} games, {sum(sizes) / 1e6:.1f} MB compressed "
+          f"({len(s3_game_files) - len(missing)} already downloaded, {len(missing) - len(sizes)} not in this year)")
+    return len(sizes), sum(sizes)
+
+
+def download_games(league=LEAGUE, year=YEAR, workers=WORKERS, mappings_data=None):
     start_time = time.time()
 
-    local_mapping_file = f"{LEAGUE}/esports-data/mapping_data.json"
-    with open(local_mapping_file, "r") as json_file:
-        mappings_data = json.load(json_file)
+    # All of the league's games, unless a filtered selection was passed in
+    if mappings_data is None:
+        mappings_data = load_reference(league, "mapping_data")
+        if mappings_data is None:
+            return
 
-    local_directory = f"{LEAGUE}/games/{YEAR}"
+    local_directory = f"{league}/games/{year}"
     if not os.path.exists(local_directory):
         os.makedirs(local_directory)
 
+    manifest = load_manifest(league)
     game_counter = 0
 
-    for esports_game in mappings_data:
-        s3_game_file = f"{LEAGUE}/games/{YEAR}/{esports_game["platformGameId"]}"
-
-        response = download_gzip_and_write_to_json(s3_game_file)
-        
+    def report(response):
+        nonlocal game_counter
         if (response == True):
             game_counter += 1
             if game_counter % 10 == 0:
-                print(f"----- Processed {game_counter} games, current run time: {
-                    round((time.time() - start_time)/60, 2)} minutes")
+                run_time = round((time.time() - start_time) / 60, 2)
+                print(f"----- Processed {game_counter} games, current run time: {run_time} minutes")
+            if game_counter % MANIFEST_SAVE_INTERVAL == 0:
+                save_manifest(league, manifest)
+
+    s3_game_files = [f"{league}/games/{year}/{esports_game['platformGameId']}"
+                     for esports_game in mappings_data]
+
+    try:
+        if workers <= 1:
+            for s3_game_file in s3_game_files:
+                report(download_gzip_and_write_to_json(s3_game_file, manifest))
+            return
+
+        # At most `workers` requests run at once; keep no more than as many again queued
+        # behind them, so the pending futures (and memory) stay bounded
+        max_pending = workers * 2
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = set()
+            for s3_game_file in s3_game_files:
+                if len(pending) >= max_pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        report(future.result())
+                pending.add(executor.submit(download_gzip_and_write_to_json, s3_game_file, manifest))
+
+            for future in wait(pending).done:
+                report(future.result())
+    finally:
+        save_manifest(league, manifest)
 
 
 if __name__ == "__main__":
-    download_esports_files()
-    download_games()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Download esports data and game data from S3.")
+    parser.add_argument('--league', default=LEAGUE, help=f"The league to download, e.g. game-changers, vct-challengers or vct-international (default: {LEAGUE}).")
+    parser.add_argument('--year', type=year_range, default=[YEAR], help=f"The year, or inclusive range of years, of the games to download, e.g. 2024 or 2022-2024 (default: {YEAR}).")
+    parser.add_argument('--tournament', nargs='+', help="Only games of these tournaments (id or name from tournaments.json).")
+    parser.add_argument('--team', nargs='+', help="Only games involving these teams (id, name, acronym or slug from teams.json).")
+    parser.add_argument('--dry-run', action='store_true', help="Report how many games and bytes would be fetched using HEAD requests only.")
+    parser.add_argument('--workers', type=int, default=WORKERS, help=f"Number of games to download concurrently; 1 downloads sequentially (default: {WORKERS}).")
+    parser.add_argument('--cache-dir', default=BLOB_CACHE_DIR, help="Shared download cache used by every checkout on this host.")
+    parser.add_argument('--cache-max-gb', type=float, help="Evict least recently used cached files beyond this size.")
+    parser.add_argument('--no-cache', action='store_true', help="Download everything directly, bypassing the shared cache.")
+    parser.add_argument('--metrics-log', help="Append this run's stage metrics as a JSON line to this file.")
+    parser.add_argument('--metrics-summary', action='store_true', help="Print a per-stage timing summary at the end of the run.")
+    args = parser.parse_args()
+
+    BLOB_CACHE_DIR = None if args.no_cache else args.cache_dir
+    if args.cache_max_gb is not None:
+        BLOB_CACHE_MAX_BYTES = int(args.cache_max_gb * 1024 ** 3)
+
+    try:
+        download_esports_files(args.league)
+        # Filters are resolved against the reference data before any game request
+        games = select_games(args.league, args.tournament, args.team)
+        if games is not None:
+            print(f"Selected {len(games)} games")
+            for year in args.year:
+                if args.dry_run:
+                    dry_run_games(args.league, year, games, args.workers)
+                else:
+                    download_games(args.league, year, args.workers, games)
+    finally:
+        run_info = {"command": "dataExtractor", "league": args.league, "year": args.year, "workers": args.workers,
+                    "tournament": args.tournament, "team": args.team, "dry_run": args.dry_run}
+        if args.metrics_log:
+            metrics.write_log(args.metrics_log, **run_info)
+        if args.metrics_summary:
+            print(metrics.summary(**run_info))
@@ -0,0 +1,133 @@
+import gc
+import json
+import os
+from operator import itemgetter
+import jsonBackend
+
+# Game files are one top-level JSON array of events. Reading them with
+# json.load keeps every event dict in memory at once; iter_game_events
+# decodes them one at a time from a fixed-size text buffer instead.
+#
+# iter_game_event_spans does the same and also yields each event's byte
+# range in the file. It reads the file as latin-1 so that text positions
+# are byte positions; only ASCII structure (keys, numbers) is reliable in
+# those events, so callers decode the span again when they need strings.
+#
+# With a faster JSON backend installed (see jsonBackend.py), iter_game_events
+# decodes game files up to WHOLE_FILE_MAX_BYTES in one backend call instead
+# (with garbage collection paused while the events are built), trading the
+# bounded memory of streaming for a faster parse. Larger files, and every
+# file under the standard library backend, are streamed.
+
+CHUNK_SIZE = 1024 * 1024
+WHOLE_FILE_MAX_BYTES = 16 * 1024 * 1024
+WHITESPACE = " \t\n\r"
+
+decoder = json.JSONDecoder()
+
+
+def iter_game_events(path, chunk_size=CHUNK_SIZE):
+    if jsonBackend.BACKEND != 'json' and os.path.getsize(path) <= WHOLE_FILE_MAX_BYTES:
+        return iter(load_game_events(path))
+    return map(itemgetter(0), scan_game_events(path, "utf-8", chunk_size))
+
+
+def load_game_events(path):
+    # Every event of the file as one list, decoded by the configured backend
+    gc_enabled = gc.isenabled()
+    # Everything decoded stays reachable, so collections during the decode only cost time
+    gc.disable()
+    try:
+        events = jsonBackend.load_path(path)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    if not isinstance(events, list):
+        raise ValueError(f"Game file {path} is not a JSON array")
+    return events
+
+
+def iter_game_event_spans(path, chunk_size=CHUNK_SIZE):
+    # (event, start byte, end byte) for every event of the file
+    return scan_game_events(path, "latin-1", chunk_size)
+
+
+def scan_game_events(path, encoding, chunk_size):
+    # (event, start, end) with start/end as text positions from the start of the file
+    with open(path, "r", encoding=encoding, newline="") as game_file:
+        buffer = game_file.read(chunk_size)
+        eof = len(buffer) == 0
+        position = 0
+        base = 0
+        # What may come next: "[" opening the array, the first event or "]", "," or "]"
+        # after an event, or an event after ","
+        expecting = "["
+
+        while True:
+            # Skip whitespace, pulling in more text when the buffer runs dry
+            while position < len(buffer) and buffer[position] in WHITESPACE:
+                position += 1
+            if position == len(buffer):
+                if eof:
+                    raise ValueError(f"Unexpected end of game file {path}")
+                base += len(buffer)
+                buffer = game_file.read(chunk_size)
+                eof = len(buffer) == 0
+                position = 0
+                continue
+
+            character = buffer[position]
+            if expecting == "[":
+                if character != "[":
+                    raise ValueError(f"Game file {path} is not a JSON array")
+                expecting = "first"
+                position += 1
+                continue
+            if expecting == "separator":
+                if character == "]":
+                    return
+                if character != ",":
+                    raise ValueError(f"Expected ',' or ']' at position {base + position} of game file {path}")
+                expecting = "event"
+                position += 1
+                continue
+            if character == "]" and expecting == "first":
+                return
+            if character in ",]":
+                raise ValueError(f"Expected an event at position {base + position} of game file {path}")
+
+            try:
+                event, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                # The event straddles the buffer boundary; read more and retry
+                more = game_file.read(chunk_size)
+                eof = len(more) == 0
+                buffer = buffer[position:] + more
+                base += position
+                position = 0
+                continue
+
+            yield event, base + position, base + end
+            position = end
+            expecting = "separator"
+
+            # Drop consumed text so the buffer stays around chunk_size
+            if position >= chunk_size:
+                buffer = buffer[position:]
+                base += position
+                position = 0
+
+
+def event_game_time(event):
+    # Seconds into the game from the event metadata ("123.456s" or a number), NaN if absent
+    game_time = event.get('metadata', {}).get('gameTime')
+    if isinstance(game_time, dict):
+        game_time = game_time.get('includedPauses', game_time.get('value'))
+    if isinstance(game_time, str):
+        game_time = game_time.rstrip('s')
+    try:
+        return float(game_time)
+    except (TypeError, ValueError):
+        return float('nan')
@@ -0,0 +1,142 @@
+import json
+import os
+import sys
+import time
+import argparse
+
+# One place to decode JSON with the fastest library installed. The first of
+# BACKENDS that imports is used (set VCT_JSON_BACKEND to pin one, e.g.
+# "json" for the standard library); none of them is a requirement.
+#
+# Every backend produces the same Python objects as the standard library
+# for the documents we read. Where a backend rejects JSON that the standard
+# library accepts (integers beyond 64 bits, NaN), loads() decodes it again
+# with the standard library, so results never depend on the backend.
+#
+# The backend decodes whole documents: reference data, indexes, state files,
+# round spans, and game files up to gameEvents.WHOLE_FILE_MAX_BYTES. Larger
+# game files, and all of them under the standard library backend, are
+# streamed one event at a time instead (gameEvents.py).
+
+BACKENDS = ('orjson', 'simdjson', 'ujson', 'json')
+
+
+def import_backend(name):
+    # The backend's loads function; ImportError when it is not installed
+    if name == 'orjson':
+        import orjson
+        return orjson.loads
+    if name == 'simdjson':
+        import simdjson
+        return simdjson.loads
+    if name == 'ujson':
+        import ujson
+        return ujson.loads
+    if name == 'json':
+        return json.loads
+    raise ImportError(f"Unknown JSON backend {name}")
+
+
+def available_backends():
+    names = []
+    for name in BACKENDS:
+        try:
+            import_backend(name)
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
+
+def choose_backend(preferred=None):
+    for name in ([preferred] if preferred else []) + list(BACKENDS):
+        try:
+            return name, import_backend(name)
+        except ImportError:
+            continue
+
+
+BACKEND, backend_loads = choose_backend(os.getenv("VCT_JSON_BACKEND"))
+
+
+def use_backend(name):
+    # Switch backends at runtime (benchmarks); raises ImportError if not installed
+    global BACKEND, backend_loads
+    backend_loads = import_backend(name)
+    BACKEND = name
+
+
+def loads(data):
+    # data may be str or bytes
+    try:
+        return backend_loads(data)
+    except ValueError:
+        if BACKEND == 'json':
+            raise
+        return json.loads(data)
+
+
+def load(json_file):
+    return loads(json_file.read())
+
+
+def load_path(path):
+    with open(path, "rb") as json_file:
+        return loads(json_file.read())
+
+
+def benchmark_backend(name, paths, repeat):
+    # Best-of-repeat seconds to load every file whole, and the number of top-level values
+    use_backend(name)
+    best, count = None, 0
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        count = 0
+        for path in paths:
+            document = load_path(path)
+            count += len(document) if isinstance(document, list) else 1
+            del document
+        elapsed = time.perf_counter() - start_time
+        best = elapsed if best is None else min(best, elapsed)
+    return best, count
+
+
+def decodes_identically(name, paths):
+    # True when the backend's documents equal the standard library's for every file
+    for path in paths:
+        with open(path, "rb") as json_file:
+            data = json_file.read()
+        use_backend(name)
+        if loads(data) != json.loads(data):
+            return False
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the installed JSON backends loading whole JSON files.")
+    parser.add_argument('paths', nargs='+', help="JSON files, or directories of them")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per backend; the fastest is reported (default: 3).")
+    args = parser.parse_args()
+
+    paths = []
+    for path in args.paths:
+        if os.path.isdir(path):
+            paths += sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith(".json"))
+        else:
+            paths.append(path)
+    size = sum(os.path.getsize(path) for path in paths)
+    print(f"{len(paths)} files, {size / 1e6:.1f} MB; default backend: {BACKEND}")
+
+    reference_seconds, count = benchmark_backend('json', paths, args.repeat)
+    print(f"{'json':<10}{reference_seconds:8.2f}s {size / reference_seconds / 1e6:8.1f} MB/s {count / reference_seconds:>12,.0f} values/s")
+    mismatches = 0
+    for name in available_backends():
+        if name == 'json':
+            continue
+        seconds, _ = benchmark_backend(name, paths, args.repeat)
+        same = decodes_identically(name, paths)
+        mismatches += not same
+        print(f"{name:<10}{seconds:8.2f}s {size / seconds / 1e6:8.1f} MB/s {count / seconds:>12,.0f} values/s "
+              f"{reference_seconds / seconds:5.1f}x {'identical' if same else 'DIFFERENT from json'}")
+    if mismatches:
+        sys.exit(1)
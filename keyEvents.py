@@ -0,0 +1,225 @@
+import json
+import math
+import os
+import argparse
+from collections import deque, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from gameEvents import iter_game_events, event_game_time
+from statCollectors import EventDispatcher
+from roundState import RoundStateCollector
+from referenceCatalog import ReferenceCatalog
+
+# Key-event log for README "DB 1": each game is streamed once and reduced
+# to the moments worth finding later, one compact JSON object per line:
+#
+#   {event}/keyEvents/{year}.jsonl
+#
+# Entry types: first_blood, multi_kill (3-4 kills in a round), ace (5 kills
+# or the whole enemy team), clutch (1vX situations from RoundStateCollector)
+# and damage_swing (one team out-damaging the other by a wide margin over a
+# short window). Every entry carries the game, round number, game time in
+# seconds and the wall time of the event that triggered it.
+
+MULTI_KILL_MIN = 3
+ACE_KILLS = 5
+DAMAGE_SWING_WINDOW_SECONDS = 10.0
+DAMAGE_SWING_THRESHOLD = 450
+
+KEY_EVENTS_DIRECTORY = "keyEvents"
+
+
+def wall_time(event):
+    return event.get('metadata', {}).get('wallTime')
+
+
+def seconds(game_time):
+    return None if math.isnan(game_time) else round(game_time, 3)
+
+
+class KeyEventCollector:
+    # Must run after round_state in the dispatcher so slots and teams are up to date
+    def __init__(self, round_state):
+        self.round_state = round_state
+        self.entries = []
+        self.in_round = False
+
+    def handlers(self):
+        return {
+            'roundStarted': self.on_round_started,
+            'playerDied': self.on_player_died,
+            'damageEvent': self.on_damage,
+            'roundEnded': self.on_round_ended,
+            'roundDecided': self.on_round_ended,
+        }
+
+    def on_round_started(self, round_started, event):
+        if self.in_round:
+            self.finish_round()
+        self.in_round = True
+        self.round_number = round_started.get('roundNumber')
+        self.kills = defaultdict(list)     # killer id -> [(game time, wall time)]
+        self.victims = defaultdict(set)    # killer id -> distinct victims
+        self.first_blood = True
+        # Damage dealt to the other team inside the sliding window
+        self.damage_window = deque()       # (game time, team id, amount)
+        self.window_damage = defaultdict(float)
+
+    def add(self, entry_type, game_time, event, **fields):
+        self.entries.append({'round': self.round_number, 'type': entry_type, 'time': seconds(game_time),
+                             'wall_time': wall_time(event), **fields})
+
+    def team_of(self, player_id):
+        slot = self.round_state.slots.get(player_id)
+        return self.round_state.team_of_slot[slot] if slot is not None else None
+
+    def on_player_died(self, player_died, event):
+        if not self.in_round:
+            return
+        killer_id = player_died.get('killerId', {}).get('value')
+        victim_id = player_died.get('deceasedId', {}).get('value')
+        game_time = event_game_time(event)
+        # The round's first death is its first blood, with or without a killer, as in
+        # statCollectors.FirstBloodCollector (player is None when nobody gets the kill)
+        if self.first_blood:
+            self.first_blood = False
+            self.add('first_blood', game_time, event, player=killer_id, victim=victim_id)
+        if killer_id is None or victim_id is None or killer_id == victim_id:
+            return
+        # Team kills do not count towards multi-kills or aces
+        killer_team = self.team_of(killer_id)
+        if killer_team is not None and killer_team == self.team_of(victim_id):
+            return
+        self.kills[killer_id].append((game_time, wall_time(event)))
+        self.victims[killer_id].add(victim_id)
+
+    def on_damage(self, damage_event, event):
+        if not self.in_round:
+            return
+        causer_team = self.team_of(damage_event.get('causerId', {}).get('value'))
+        victim_team = self.team_of(damage_event.get('victimId', {}).get('value'))
+        game_time = event_game_time(event)
+        if causer_team is None or causer_team == victim_team or math.isnan(game_time):
+            return
+
+        amount = damage_event.get('damageAmount', 0)
+        self.damage_window.append((game_time, causer_team, amount))
+        self.window_damage[causer_team] += amount
+        while self.damage_window[0][0] < game_time - DAMAGE_SWING_WINDOW_SECONDS:
+            _, team_id, old_amount = self.damage_window.popleft()
+            self.window_damage[team_id] -= old_amount
+
+        other_damage = sum(damage for team_id, damage in self.window_damage.items() if team_id != causer_team)
+        swing = self.window_damage[causer_team] - other_damage
+        if swing >= DAMAGE_SWING_THRESHOLD:
+            self.add('damage_swing', self.damage_window[0][0], event, team=causer_team, damage=round(swing),
+                     end_time=seconds(game_time))
+            # Start a fresh window so one burst is reported once
+            self.damage_window.clear()
+            self.window_damage.clear()
+
+    def on_round_ended(self, round_ended, event):
+        if self.in_round:
+            self.finish_round()
+
+    def finish_round(self):
+        self.in_round = False
+        for killer_id, kills in self.kills.items():
+            if len(kills) < MULTI_KILL_MIN:
+                continue
+            killer_team = self.team_of(killer_id)
+            enemies = sum(1 for player_id in self.round_state.player_ids
+                          if self.team_of(player_id) not in (None, killer_team))
+            ace = len(kills) >= ACE_KILLS or (enemies and len(self.victims[killer_id]) >= enemies)
+            (start_time, start_wall_time), (end_time, _) = kills[0], kills[-1]
+            self.entries.append({'round': self.round_number, 'type': 'ace' if ace else 'multi_kill',
+                                 'time': seconds(start_time), 'wall_time': start_wall_time,
+                                 'player': killer_id, 'kills': len(kills), 'end_time': seconds(end_time)})
+
+    def finish(self):
+        if self.in_round:
+            self.finish_round()
+        for clutch in self.round_state.clutch_records:
+            self.entries.append({'round': clutch.round_number, 'type': 'clutch', 'time': seconds(clutch.game_time),
+                                 'wall_time': None, 'player': clutch.player_id, 'team': clutch.team_id,
+                                 'opponents': clutch.opponents, 'won': clutch.won})
+        # Round order, then time within the round (entries without a time go last)
+        self.entries.sort(key=lambda entry: (entry['round'] if entry['round'] is not None else -1,
+                                             entry['time'] is None, entry['time'] or 0))
+        return self.entries
+
+
+def game_key_events(game_path):
+    round_state = RoundStateCollector()
+    collector = KeyEventCollector(round_state)
+    EventDispatcher([round_state, collector]).run(iter_game_events(game_path))
+    round_state.finish()
+    return collector.finish()
+
+
+# Per-process state for resolving in-game ids to esports ids
+catalog = None
+
+
+def init_worker(event):
+    global catalog
+    if catalog is None:
+        catalog = ReferenceCatalog.load(event)
+
+
+def game_log_lines(game_path):
+    game_file = os.path.basename(game_path)
+    game_id = f"val:{game_file.split('_')[1].replace('.json', '')}"
+    game_mappings = catalog.game(game_id) or {}
+    participants = game_mappings.get('participantMapping', {})
+    teams = game_mappings.get('teamMapping', {})
+
+    lines = []
+    for entry in game_key_events(game_path):
+        for field in ('player', 'victim'):
+            if field in entry:
+                entry[field] = participants.get(str(entry[field]), entry[field])
+        if 'team' in entry:
+            entry['team'] = teams.get(str(entry['team']), entry['team'])
+        lines.append(json.dumps({'game': game_id, **entry}, separators=(',', ':')))
+    return lines
+
+
+def key_events_path(event, year):
+    return f"{event}/{KEY_EVENTS_DIRECTORY}/{year}.jsonl"
+
+
+def write_key_event_log(year, event, workers=1):
+    init_worker(event)
+    games_dir = f"{event}/games/{year}"
+    game_paths = [os.path.join(games_dir, game_file)
+                  for game_file in sorted(os.listdir(games_dir)) if game_file.endswith(".json")]
+
+    output_path = key_events_path(event, year)
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    temp_path = f"{output_path}.part"
+    entries = 0
+    with open(temp_path, "w") as log_file:
+        if workers > 1:
+            with ProcessPoolExecutor(workers, initializer=init_worker, initargs=(event,)) as executor:
+                results = executor.map(game_log_lines, game_paths, chunksize=4)
+                for lines in results:
+                    log_file.writelines(line + "\n" for line in lines)
+                    entries += len(lines)
+        else:
+            for game_path in game_paths:
+                lines = game_log_lines(game_path)
+                log_file.writelines(line + "\n" for line in lines)
+                entries += len(lines)
+    os.replace(temp_path, output_path)
+    return output_path, len(game_paths), entries
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a compact log of key events (multi-kills, aces, clutches, first bloods, damage swings) for a league-year.")
+    parser.add_argument('year', help="Example: 2024")
+    parser.add_argument('event', help="Example: vct-international")
+    parser.add_argument('--workers', type=int, default=1, help="Number of games scanned in parallel (default: 1).")
+    args = parser.parse_args()
+
+    output_path, games, entries = write_key_event_log(args.year, args.event, args.workers)
+    print(f"Wrote {entries} key events from {games} games to {output_path}")
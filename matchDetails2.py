@@ -1,23 +1,23 @@
-import json
+import jsonBackend
 import pandas as pd
 from collections import defaultdict
 
 # Load the JSON files
 with open("game-changers/games/2024/val_03c7dfd8-5928-4e3d-8a03-bc61594e7aa9.json", "r") as new_game_data_file:
-    game_events = json.load(new_game_data_file)
+    game_events = jsonBackend.load(new_game_data_file)
 
 with open("game-changers/esports-data/mapping_data.json", "r") as mapping_file:
-    mapping_data = json.load(mapping_file)
+    mapping_data = jsonBackend.load(mapping_file)
 
 with open("game-changers/esports-data/players.json", "r") as players_file:
-    players_data = json.load(players_file)
+    players_data = jsonBackend.load(players_file)
 
 with open("game-changers/esports-data/teams.json", "r") as teams_file:
-    teams_data = json.load(teams_file)
+    teams_data = jsonBackend.load(teams_file)
 
 # Load the agent mapping file
 with open("game-changers/esports-data/agent.txt", "r") as agent_file:
-    agent_mapping = json.load(agent_file)
+    agent_mapping = jsonBackend.load(agent_file)
 
 # Identify the relevant game ID and extract the necessary mappings
 game_id = 'val:03c7dfd8-5928-4e3d-8a03-bc61594e7aa9'
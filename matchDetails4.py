@@ -1,190 +1,305 @@
-import json 
+import json
 import pandas as pd
 import os
 import sys
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from collections import defaultdict
-
-# Command-line arguments for year and event
-year = sys.argv[1]  # Example: "2024"
-event = sys.argv[2]  # Example: "vct-international"
-
-# Path to the games directory
-games_dir = f"{event}/games/{year}/"
-
-# Load the necessary static data files
-with open(f"{event}/esports-data/mapping_data.json", "r") as mapping_file:
-    mapping_data = json.load(mapping_file)
-
-with open(f"{event}/esports-data/players.json", "r", encoding="utf-8") as players_file:
-    players_data = json.load(players_file)
-
-with open(f"{event}/esports-data/teams.json", "r") as teams_file:
-    teams_data = json.load(teams_file)
-
-with open(f"{event}/esports-data/agent.txt", "r") as agent_file:
-    agent_mapping = json.load(agent_file)
-
-# Agent type classification
-agent_type_mapping = {
-    "Duelist": ["Jett", "Reyna", "Raze", "Yoru", "Phoenix", "Neon", "Iso"],
-    "Controller": ["Omen", "Brimstone", "Astra", "Viper", "Harbor"],
-    "Sentinel": ["Killjoy", "Cypher", "Sage", "Chamber", "Deadlock"],
-    "Initiator": ["Breach", "Skye", "Sova", "Kayo", "Fade", "Gekko"]
-}
-
-# Function to determine agent type
-def get_agent_type(agent_name):
-    for agent_type, agents in agent_type_mapping.items():
-        if agent_name in agents:
-            return agent_type
-    return 'Unknown'  # Default if agent type is not found
-
-# Iterate over all game JSON files in the directory
-for game_file in os.listdir(games_dir):
-    if game_file.endswith(".json"):
-        # Construct the game_id from the file name
-        game_id = f"val:{game_file.split('_')[1].replace('.json', '')}"
-        print(f"Processing game ID: {game_id}")
-
-        # Load the game events
-        with open(os.path.join(games_dir, game_file), "r") as new_game_data_file:
-            game_events = json.load(new_game_data_file)
-
-        # Find the relevant game mappings based on the game_id
-        game_mappings = next((item for item in mapping_data if item["platformGameId"] == game_id), None)
-
-        # Extract participantMapping and teamMapping for the game
-        if game_mappings:
-            participant_mapping = game_mappings.get('participantMapping', {})
-            team_mapping = game_mappings.get('teamMapping', {})
-
-        # Convert mappings to DataFrames
-        participants_df = pd.DataFrame(list(participant_mapping.items()), columns=['playerId', 'mappedId'])
-        players_df = pd.DataFrame(players_data)
-        teams_df = pd.DataFrame(teams_data)
-
-        team_ids = list(team_mapping.values())
-
-        # Get team names dynamically by matching the IDs from team_mapping with the teams_data DataFrame
-        team_names = []
-        for team_id in team_ids:
-            team_name = teams_df[teams_df['id'] == team_id]['name'].values[0] if team_id in teams_df['id'].values else 'Unknown'
-            team_names.append(team_name)
-
-        # Assuming the match is between two teams
-        team1_name = team_names[0] if len(team_names) > 0 else 'Unknown'
-        team2_name = team_names[1] if len(team_names) > 1 else 'Unknown'
-
-        # Merge player data with participants data
-        players_in_game = participants_df.merge(players_df, left_on='mappedId', right_on='id', how='left')
-
-        # Remove duplicates and select only 10 unique players based on their 'id'
-        players_in_game_unique = players_in_game.drop_duplicates(subset=['id']).head(10)
-
-        # Initialize a dictionary to store player stats
-        player_stats = defaultdict(lambda: {'kills': 0, 'deaths': 0, 'assists': 0, 'damage': 0, 'ability_uses': 0,
-                                            'first_bloods': 0, 'first_deaths': 0, 'agent': 'Unknown', 'agent_type': 'Unknown', 'tier': 'VCT International'})
-
-        # Function to map agents to players from configuration events
-        def map_agents_to_players(event):
-            if 'configuration' in event:
-                # Extract teams and players from the configuration
-                configuration = event.get('configuration', {})
-                # Loop through each player in the configuration
-                for player in configuration.get('players', []):
-                    player_id = player.get('playerId', {}).get('value', None)
-                    agent_guid = player.get('selectedAgent', {}).get('fallback', {}).get('guid', '').lower()  # Extract the agent GUID safely
-                    if player_id is not None and agent_guid:
-                        # Directly look up the agent name using the agent GUID
-                        agent_name = agent_mapping.get(agent_guid, 'Unknown')  # 'Unknown' if GUID not found
-                        player_stats[player_id]['agent'] = agent_name
-                        # Assign agent type using the mapping
-                        player_stats[player_id]['agent_type'] = get_agent_type(agent_name)
-
-        def update_player_stats(event):
-            if 'playerDied' in event:
-                deceased = event.get('playerDied', {}).get('deceasedId', {}).get('value', None)
-                killer = event.get('playerDied', {}).get('killerId', {}).get('value', None)
-                assistants = event.get('playerDied', {}).get('assistants', [])
-
-                if killer is not None:
-                    player_stats[killer]['kills'] += 1
-                if deceased is not None:
-                    player_stats[deceased]['deaths'] += 1
-
-                for assistant in assistants:
-                    assistant_id = assistant.get('assistantId', {}).get('value', None)
-                    if assistant_id is not None:
-                        player_stats[assistant_id]['assists'] += 1
-
-            elif 'damageEvent' in event:
-                causer = event.get('damageEvent', {}).get('causerId', {}).get('value', None)
-                damage_amount = event.get('damageEvent', {}).get('damageAmount', 0)
-
-                if causer is not None:
-                    player_stats[causer]['damage'] += damage_amount
-
-            elif 'abilityUsed' in event:
-                player = event.get('abilityUsed', {}).get('playerId', {}).get('value', None)
-                if player is not None:
-                    player_stats[player]['ability_uses'] += 1
-
-        def track_first_bloods(events, current_round):
-            global round_active, first_kill_recorded
-            for event in events:
-                if 'roundStarted' in event:
-                    round_active = True
-                    first_kill_recorded = False
-                    current_round = event.get('roundStarted', {}).get('roundNumber', current_round)
-
-                elif 'playerDied' in event and round_active and not first_kill_recorded:
-                    killer = event.get('playerDied', {}).get('killerId', {}).get('value', None)
-                    victim = event.get('playerDied', {}).get('deceasedId', {}).get('value', None)
-
-                    if killer is not None:
-                        player_stats[killer]['first_bloods'] += 1
-                    if victim is not None:
-                        player_stats[victim]['first_deaths'] += 1
-
-                    first_kill_recorded = True
-
-        # Process all events in the game data
-        current_round = 0
-        for event in game_events:
-            map_agents_to_players(event)
-            track_first_bloods([event], current_round)
-            update_player_stats(event)
-
-        # Convert player stats to a DataFrame (without revives)
-        player_stats_df = pd.DataFrame.from_dict(player_stats, orient='index').reset_index()
-        player_stats_df.columns = ['playerId', 'kills', 'deaths', 'assists', 'damage', 'ability_uses', 'first_bloods', 'first_deaths', 'agent', 'agent_type', 'tier']
-
-        # Convert playerId to string to match the type in players_in_game_unique
-        player_stats_df['playerId'] = player_stats_df['playerId'].astype(str)
-
-        # Merge player stats with player details
-        combined_stats = players_in_game_unique.merge(player_stats_df, left_on='playerId', right_on='playerId', how='left')
-
-        # Sort players by team (home_team_id) and within team by kills
-        combined_stats = combined_stats.sort_values(by=['home_team_id', 'kills'], ascending=[True, False])
-
-        # Select and reorder columns for display
-        display_columns = ['handle', 'first_name', 'last_name', 'home_team_id', 'agent', 'agent_type', 'tier', 'kills', 'deaths', 'assists', 'damage', 'ability_uses', 'first_bloods', 'first_deaths']
-        final_stats = combined_stats[display_columns]
-
-        # Save the final sorted combined stats to JSON
-        game_file_name = os.path.basename(game_file)
-        folder_name = os.path.splitext(game_file_name)[0]
-
-        # Create the directory structure if it doesn't exist
-        output_directory = "processedData"
-        if not os.path.exists(output_directory):
-            os.makedirs(output_directory)
-
-        # Define the JSON output path
-        output_json = os.path.join(output_directory, f"{folder_name}.json")
-
-        # Save the final sorted combined stats to JSON
+import jsonBackend
+from gameEvents import iter_game_events
+from referenceCatalog import ReferenceCatalog, get_agent_type
+from columnarStore import ColumnarGame, columnar_dir, convert_game, is_converted
+from vectorizedStats import compute_player_stats
+from pipelineMetrics import PipelineMetrics, timed_stage
+from consolidatedOutput import ConsolidatedWriter, iter_game_records
+from statCollectors import (EventDispatcher, AgentCollector, KillCollector, DamageCollector,
+                            AbilityCollector, FirstBloodCollector)
+
+# Bump when a change to the processing logic should invalidate existing outputs
+PROCESSOR_VERSION = 1
+
+OUTPUT_DIRECTORY = "processedData"
+
+# Per-game record of the inputs each existing output was built from,
+# used by --incremental to skip games that have not changed
+PROCESSING_STATE_FILE = os.path.join(OUTPUT_DIRECTORY, ".processing_state.json")
+
+# Reference data shared by every game; loaded once per process and league
+# (worker processes forked from the parent inherit it without reloading)
+catalog = None
+catalogs = {}
+games_dir = None
+columnar_games_dir = None
+vectorized = False
+# With --consolidated, games are handed back to the parent and appended to one partition
+consolidated = False
+league_year = None
+# Game ids already in that partition, read on first use by is_up_to_date
+partition_game_ids = None
+
+# Per-process stage metrics (None unless --metrics-log/--metrics-summary is given),
+# and the process that created them
+metrics = None
+metrics_pid = None
+
+# Function to set up the per-process state used by process_game
+def init_worker(year, event, use_vectorized=False, collect_metrics=False, use_consolidated=False):
+    global catalog, games_dir, columnar_games_dir, vectorized, consolidated, league_year, partition_game_ids
+    global metrics, metrics_pid
+    # A forked worker inherits the parent's metrics (already holding its catalog_load);
+    # it starts its own so nothing the parent recorded is sent back twice
+    if collect_metrics and (metrics is None or metrics_pid != os.getpid()):
+        metrics = PipelineMetrics()
+        metrics_pid = os.getpid()
+    if event not in catalogs:
+        with timed_stage(metrics, 'catalog_load'):
+            catalogs[event] = ReferenceCatalog.load(event)
+    catalog = catalogs[event]
+    # Path to the games directory
+    games_dir = f"{event}/games/{year}/"
+    columnar_games_dir = columnar_dir(event, year)
+    vectorized = use_vectorized
+    consolidated = use_consolidated
+    if league_year != (event, year):
+        league_year = (event, year)
+        partition_game_ids = None
+
+# Function to build the merged participant/player rows for a game without
+# rebuilding the players DataFrame (same rows as a left merge on 'id')
+def players_in_game_frame(participant_mapping):
+    columns = ['playerId', 'mappedId'] + catalog.player_columns
+    rows = []
+    for player_id, mapped_id in participant_mapping.items():
+        records = catalog.player_records(mapped_id)
+        if not records:
+            rows.append({'playerId': player_id, 'mappedId': mapped_id})
+        for record in records:
+            rows.append({'playerId': player_id, 'mappedId': mapped_id, **record})
+    return pd.DataFrame(rows, columns=columns)
+
+# Function to compute a game's player stats event by event with the stat collectors
+def collected_player_stats(game_file):
+    # Stream the game events one at a time instead of loading the whole file
+    game_path = os.path.join(games_dir, game_file)
+    game_events = iter_game_events(game_path)
+    if metrics is not None:
+        metrics.add('parse', size=os.path.getsize(game_path), calls=0)
+
+    # Initialize a dictionary to store player stats
+    player_stats = defaultdict(lambda: {'kills': 0, 'deaths': 0, 'assists': 0, 'damage': 0, 'ability_uses': 0,
+                                        'first_bloods': 0, 'first_deaths': 0, 'agent': 'Unknown', 'agent_type': 'Unknown', 'tier': 'VCT International'})
+
+    # Each collector only sees the event types it registered for
+    dispatcher = EventDispatcher([
+        AgentCollector(player_stats, catalog.agent_mapping, get_agent_type),
+        KillCollector(player_stats),
+        DamageCollector(player_stats),
+        AbilityCollector(player_stats),
+        FirstBloodCollector(player_stats),
+    ], metrics)
+
+    # Process all events in the game data
+    dispatcher.run(game_events)
+
+    # Convert player stats to a DataFrame (without revives)
+    player_stats_df = pd.DataFrame.from_dict(player_stats, orient='index').reset_index()
+    player_stats_df.columns = ['playerId', 'kills', 'deaths', 'assists', 'damage', 'ability_uses', 'first_bloods', 'first_deaths', 'agent', 'agent_type', 'tier']
+
+    # Convert playerId to string to match the type in players_in_game_unique
+    player_stats_df['playerId'] = player_stats_df['playerId'].astype(str)
+
+    return player_stats_df
+
+# Function to compute a game's player stats with array operations over its columnar tables
+def vectorized_player_stats(game_file):
+    game_path = os.path.join(games_dir, game_file)
+    game_dir = os.path.join(columnar_games_dir, os.path.splitext(game_file)[0])
+    if not is_converted(game_path, game_dir):
+        with timed_stage(metrics, 'columnar_convert', items=1):
+            convert_game(game_path, game_dir)
+    with timed_stage(metrics, 'vectorized_stats', items=1):
+        return compute_player_stats(ColumnarGame(game_dir), catalog.agent_mapping, get_agent_type)
+
+# Function to compute and save the player stats for one game file
+def process_game(game_file):
+    # Construct the game_id from the file name
+    game_id = f"val:{game_file.split('_')[1].replace('.json', '')}"
+    print(f"Processing game ID: {game_id}")
+
+    # Find the relevant game mappings based on the game_id
+    game_mappings = catalog.game(game_id)
+
+    # Extract participantMapping and teamMapping for the game
+    if not game_mappings:
+        raise ValueError(f"No mapping data found for {game_id}")
+    participant_mapping = game_mappings.get('participantMapping', {})
+    team_mapping = game_mappings.get('teamMapping', {})
+
+    # Get team names by looking up the IDs from team_mapping in the catalog
+    team_names = [catalog.team_name(team_id) for team_id in team_mapping.values()]
+
+    # Assuming the match is between two teams
+    team1_name = team_names[0] if len(team_names) > 0 else 'Unknown'
+    team2_name = team_names[1] if len(team_names) > 1 else 'Unknown'
+
+    # Merge player data with participants data
+    players_in_game = players_in_game_frame(participant_mapping)
+
+    # Remove duplicates and select only 10 unique players based on their 'id'
+    players_in_game_unique = players_in_game.drop_duplicates(subset=['id']).head(10)
+
+    if vectorized:
+        player_stats_df = vectorized_player_stats(game_file)
+    else:
+        player_stats_df = collected_player_stats(game_file)
+
+    # Merge player stats with player details
+    combined_stats = players_in_game_unique.merge(player_stats_df, left_on='playerId', right_on='playerId', how='left')
+
+    # Sort players by team (home_team_id) and within team by kills
+    combined_stats = combined_stats.sort_values(by=['home_team_id', 'kills'], ascending=[True, False])
+
+    # Select and reorder columns for display
+    display_columns = ['handle', 'first_name', 'last_name', 'home_team_id', 'agent', 'agent_type', 'tier', 'kills', 'deaths', 'assists', 'damage', 'ability_uses', 'first_bloods', 'first_deaths']
+    final_stats = combined_stats[display_columns]
+
+    # Hand the serialised rows back for the parent to append to the consolidated partition
+    if consolidated:
+        with timed_stage(metrics, 'write', items=1):
+            rows_json = final_stats.to_json(orient="records")
+        print(f"Stats computed for {game_id}")
+        return game_id, rows_json
+
+    # Save the final sorted combined stats to JSON
+    game_file_name = os.path.basename(game_file)
+    folder_name = os.path.splitext(game_file_name)[0]
+
+    # Create the directory structure if it doesn't exist
+    os.makedirs(OUTPUT_DIRECTORY, exist_ok=True)
+
+    # Define the JSON output path
+    output_json = os.path.join(OUTPUT_DIRECTORY, f"{folder_name}.json")
+
+    # Save the final sorted combined stats to JSON
+    with timed_stage(metrics, 'write', items=1):
         final_stats.to_json(output_json, orient="records", indent=4)
-
-        print(f"Data has been saved to {output_json}")
+    if metrics is not None:
+        metrics.add('write', size=os.path.getsize(output_json), calls=0)
+
+    print(f"Data has been saved to {output_json}")
+    return output_json
+
+# Function to process a game, reporting failures instead of raising them;
+# also hands back this process's stage metrics for the game
+def process_game_safely(game_file):
+    try:
+        result = game_file, process_game(game_file), None
+    except Exception as error:
+        result = game_file, None, f"{type(error).__name__}: {error}"
+    return result + (metrics.drain() if metrics is not None else None,)
+
+# Function to load the incremental processing state
+def load_processing_state():
+    if not os.path.isfile(PROCESSING_STATE_FILE):
+        return {}
+    with open(PROCESSING_STATE_FILE, "r") as state_file:
+        return jsonBackend.load(state_file)
+
+# Function to save the incremental processing state atomically
+def save_processing_state(state):
+    os.makedirs(OUTPUT_DIRECTORY, exist_ok=True)
+    temp_path = f"{PROCESSING_STATE_FILE}.part"
+    with open(temp_path, "w") as state_file:
+        json.dump(state, state_file, indent=2, sort_keys=True)
+    os.replace(temp_path, PROCESSING_STATE_FILE)
+
+# Function to fingerprint everything a game's output depends on, including where it is written
+def game_fingerprint(game_file):
+    stat = os.stat(os.path.join(games_dir, game_file))
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'output_mode': 'consolidated' if consolidated else 'file',
+            'reference': catalog.fingerprint, 'processor_version': PROCESSOR_VERSION}
+
+# Function to check whether a game's existing output is still current
+def is_up_to_date(game_file, state, fingerprint=None):
+    global partition_game_ids
+    entry = state.get(os.path.join(games_dir, game_file))
+    if entry is None or entry['fingerprint'] != (fingerprint or game_fingerprint(game_file)):
+        return False
+    if not consolidated:
+        return os.path.exists(entry['output'])
+    # The game must still have a line in the partition, not just a partition directory
+    if partition_game_ids is None:
+        event, year = league_year
+        partition_game_ids = {game_id for game_id, _ in iter_game_records(OUTPUT_DIRECTORY, event, year)}
+    return f"val:{game_file.split('_')[1].replace('.json', '')}" in partition_game_ids
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compute per-player stats for every downloaded game of a league-year.")
+    parser.add_argument('year', help="Example: 2024")
+    parser.add_argument('event', help="Example: vct-international")
+    parser.add_argument('--workers', type=int, default=1, help="Number of games processed in parallel (default: 1).")
+    parser.add_argument('--vectorized', action='store_true', help="Compute stats with array operations over the columnar store, converting games as needed.")
+    parser.add_argument('--incremental', action='store_true', help="Only process games that are new or changed since the last run.")
+    parser.add_argument('--on-error', choices=['abort', 'skip'], default='abort', help="Stop at the first bad game, or report it and continue.")
+    parser.add_argument('--consolidated', action='store_true', help="Append each game's rows to one JSON-lines partition per league-year instead of writing a file per game.")
+    parser.add_argument('--metrics-log', help="Append this run's stage metrics as a JSON line to this file.")
+    parser.add_argument('--metrics-summary', action='store_true', help="Print a per-stage timing summary at the end of the run.")
+    args = parser.parse_args()
+
+    collect_metrics = bool(args.metrics_log or args.metrics_summary)
+    init_worker(args.year, args.event, args.vectorized, collect_metrics, args.consolidated)
+    # Every process drains its metrics per game; they are merged back into this process's totals
+    run_metrics = metrics
+    game_files = sorted(game_file for game_file in os.listdir(games_dir) if game_file.endswith(".json"))
+
+    state = load_processing_state()
+    # Fingerprints are taken before processing, so a file changed during the run is redone next time
+    fingerprints = {game_file: game_fingerprint(game_file) for game_file in game_files}
+    if args.incremental:
+        all_games = len(game_files)
+        game_files = [game_file for game_file in game_files if not is_up_to_date(game_file, state, fingerprints[game_file])]
+        print(f"{all_games - len(game_files)} of {all_games} games are up to date; processing {len(game_files)}")
+
+    if args.workers > 1:
+        executor = ProcessPoolExecutor(args.workers, initializer=init_worker, initargs=(args.year, args.event, args.vectorized, collect_metrics, args.consolidated))
+        results = (future.result() for future in as_completed(
+            [executor.submit(process_game_safely, game_file) for game_file in game_files]))
+    else:
+        executor = None
+        results = map(process_game_safely, game_files)
+
+    writer = ConsolidatedWriter(OUTPUT_DIRECTORY, args.event, args.year) if args.consolidated else None
+    failures = []
+    try:
+        for game_file, output, error, game_metrics in results:
+            if run_metrics is not None:
+                run_metrics.merge(game_metrics)
+            if error is None:
+                if writer is not None:
+                    writer.add(*output)
+                    output = writer.directory
+                state[os.path.join(games_dir, game_file)] = {'fingerprint': fingerprints[game_file], 'output': output}
+                continue
+            print(f"Failed to process {game_file}: {error}")
+            failures.append(game_file)
+            if args.on_error == 'abort':
+                break
+    finally:
+        if executor is not None:
+            # On abort, games not yet started are cancelled; running ones finish
+            executor.shutdown(cancel_futures=True)
+        # Flush appended games before recording them as done
+        if writer is not None:
+            writer.close()
+        save_processing_state(state)
+        if run_metrics is not None:
+            run_info = {'command': 'matchDetails4', 'year': args.year, 'event': args.event, 'workers': args.workers,
+                        'vectorized': args.vectorized, 'games': len(game_files), 'failures': len(failures)}
+            if args.metrics_log:
+                run_metrics.write_log(args.metrics_log, **run_info)
+            if args.metrics_summary:
+                print(run_metrics.summary(**run_info))
+
+    if failures:
+        print(f"{len(failures)} of {len(game_files)} games failed: {', '.join(failures)}")
+        sys.exit(1)
@@ -0,0 +1,116 @@
+import json
+import os
+import sys
+import time
+import resource
+import threading
+from contextlib import contextmanager, nullcontext
+
+# Structured per-stage metrics for the extractor and the game processors.
+#
+# A stage accumulates seconds, calls, bytes and items (events, files, ...)
+# from any thread. Worker processes drain() their totals after each unit
+# of work and the parent merge()s them, so a run's report covers every
+# process. Stage seconds are summed across workers; compare them with the
+# run's wall_seconds to see where a parallel run actually spends its time.
+#
+# write_log appends one JSON object per run to a JSON-lines file:
+#   {"run": {...}, "started": ..., "wall_seconds": ..., "peak_rss_mb": ...,
+#    "stages": {"parse": {"seconds": ..., "bytes_per_sec": ..., "items_per_sec": ...}, ...}}
+
+
+def peak_rss_mb(who=resource.RUSAGE_SELF):
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(who).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def timed_stage(metrics, stage, size=0, items=0):
+    # metrics.timed(...) when metrics are being collected, otherwise a no-op
+    return metrics.timed(stage, size, items) if metrics is not None else nullcontext()
+
+
+class PipelineMetrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stages = {}
+        self.started = time.time()
+        self.start_counter = time.perf_counter()
+
+    def add(self, stage, seconds=0.0, size=0, items=0, calls=1):
+        with self.lock:
+            totals = self.stages.get(stage)
+            if totals is None:
+                totals = self.stages[stage] = {'seconds': 0.0, 'calls': 0, 'bytes': 0, 'items': 0}
+            totals['seconds'] += seconds
+            totals['calls'] += calls
+            totals['bytes'] += size
+            totals['items'] += items
+
+    @contextmanager
+    def timed(self, stage, size=0, items=0):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start, size, items)
+
+    def timed_iter(self, stage, iterable, size=None):
+        # Charges the time spent producing each item (e.g. network reads) to `stage`
+        iterator = iter(iterable)
+        counter = time.perf_counter
+        while True:
+            start = counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            self.add(stage, counter() - start, size(item) if size else 0, 1)
+            yield item
+
+    def drain(self):
+        with self.lock:
+            stages, self.stages = self.stages, {}
+        return stages
+
+    def merge(self, stages):
+        for stage, totals in (stages or {}).items():
+            self.add(stage, totals['seconds'], totals['bytes'], totals['items'], totals['calls'])
+
+    def report(self, **run):
+        stages = {}
+        with self.lock:
+            for stage, totals in sorted(self.stages.items()):
+                seconds = totals['seconds']
+                stages[stage] = dict(totals,
+                                     bytes_per_sec=totals['bytes'] / seconds if seconds and totals['bytes'] else None,
+                                     items_per_sec=totals['items'] / seconds if seconds and totals['items'] else None)
+        return {
+            'run': run,
+            'started': time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(self.started)),
+            'wall_seconds': time.perf_counter() - self.start_counter,
+            'peak_rss_mb': peak_rss_mb(),
+            'peak_rss_children_mb': peak_rss_mb(resource.RUSAGE_CHILDREN),
+            'stages': stages,
+        }
+
+    def write_log(self, path, **run):
+        report = self.report(**run)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "a") as log_file:
+            log_file.write(json.dumps(report) + "\n")
+        return report
+
+    def summary(self, **run):
+        report = self.report(**run)
+        lines = [f"Run took {report['wall_seconds']:.2f}s, peak RSS {report['peak_rss_mb']:.1f} MB"
+                 f" (workers {report['peak_rss_children_mb']:.1f} MB)",
+                 f"{'stage':<32}{'seconds':>10}{'calls':>10}{'MB':>10}{'MB/s':>10}{'items':>10}{'items/s':>12}"]
+        for stage, totals in report['stages'].items():
+            lines.append(f"{stage:<32}{totals['seconds']:>10.3f}{totals['calls']:>10}"
+                         f"{totals['bytes'] / 1e6:>10.1f}"
+                         f"{(totals['bytes_per_sec'] or 0) / 1e6:>10.1f}"
+                         f"{totals['items']:>10}{(totals['items_per_sec'] or 0):>12,.0f}")
+        return "\n".join(lines)
@@ -0,0 +1,329 @@
+import json
+import os
+import argparse
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+import jsonBackend
+from gameEvents import iter_game_events
+from referenceCatalog import ReferenceCatalog, get_agent_type
+from statCollectors import EventDispatcher
+from roundState import RoundStateCollector, MAX_CLUTCH_OPPONENTS
+
+# Cross-game player stats (README "DB 2") built from mergeable partial
+# aggregates. A partial maps a key (player, agent, agent_type, map,
+# tournament, team) to a list of additive counters, so partials from single
+# games or whole workers merge associatively by adding counters.
+# Derived metrics (ACS, K/D, KAST, clutch %, weapon/ability kill %, ...)
+# are only computed when a merged partial is rolled up for a leaderboard.
+#
+# Per-game partials are cached as {event}/aggregates/{year}/{game}.json.
+
+AGGREGATES_VERSION = 3
+
+# 'team' is the esports team the player played for in that game (not their current home team)
+KEY_FIELDS = ('player', 'agent', 'agent_type', 'map', 'tournament', 'team')
+COUNTER_FIELDS = ('games', 'rounds', 'kills', 'deaths', 'assists', 'damage', 'combat_score',
+                  'first_bloods', 'first_deaths', 'weapon_kills', 'ability_kills', 'other_kills',
+                  'ability_uses', 'kast_rounds', 'traded_deaths', 'clutch_attempts', 'clutch_wins')
+COUNTER_FIELDS += tuple(f'v{opponents}_{outcome}' for opponents in range(1, MAX_CLUTCH_OPPONENTS + 1)
+                        for outcome in ('attempts', 'wins'))
+COUNTER_INDEX = {field: index for index, field in enumerate(COUNTER_FIELDS)}
+
+# Riot's combat score: a kill is worth 150 with five enemies alive, down to
+# 70 with one, plus 50 for each extra kill in the same round. Without team
+# data every kill counts as 150. Non-damaging assists are not scored.
+KILL_SCORE_BY_ENEMIES_ALIVE = {5: 150, 4: 130, 3: 110, 2: 90, 1: 70}
+MULTI_KILL_BONUS = 50
+
+
+class PlayerPartial:
+    def __init__(self, counters=None):
+        self.counters = counters if counters is not None else {}
+
+    def add(self, key, **values):
+        counters = self.counters.get(key)
+        if counters is None:
+            counters = self.counters[key] = [0] * len(COUNTER_FIELDS)
+        for field, value in values.items():
+            counters[COUNTER_INDEX[field]] += value
+
+    def merge(self, other):
+        for key, other_counters in other.counters.items():
+            counters = self.counters.get(key)
+            if counters is None:
+                self.counters[key] = list(other_counters)
+            else:
+                for index, value in enumerate(other_counters):
+                    counters[index] += value
+        return self
+
+    def rollup(self, by=('player',)):
+        # Sum counters over every key field not in `by`; also track distinct agents and maps
+        positions = [KEY_FIELDS.index(field) for field in by]
+        grouped = {}
+        for key, counters in self.counters.items():
+            group_key = tuple(key[position] for position in positions)
+            group = grouped.get(group_key)
+            if group is None:
+                group = grouped[group_key] = {'counters': [0] * len(COUNTER_FIELDS), 'agents': set(), 'maps': set()}
+            for index, value in enumerate(counters):
+                group['counters'][index] += value
+            group['agents'].add(key[KEY_FIELDS.index('agent')])
+            group['maps'].add(key[KEY_FIELDS.index('map')])
+        return grouped
+
+    def to_json(self):
+        return [list(key) + counters for key, counters in self.counters.items()]
+
+    @classmethod
+    def from_json(cls, rows):
+        key_length = len(KEY_FIELDS)
+        return cls({tuple(row[:key_length]): list(row[key_length:]) for row in rows})
+
+
+def merge_partials(partials):
+    merged = PlayerPartial()
+    for partial in partials:
+        merged.merge(partial)
+    return merged
+
+
+def derived_metrics(counters, agents=(), maps=()):
+    stats = dict(zip(COUNTER_FIELDS, counters))
+    rounds = stats['rounds'] or 1
+    kills = stats['kills'] or 1
+    stats['acs'] = round(stats['combat_score'] / rounds, 1)
+    stats['adr'] = round(stats['damage'] / rounds, 1)
+    stats['kd'] = round(stats['kills'] / (stats['deaths'] or 1), 2)
+    stats['weapon_kill_pct'] = round(100 * stats['weapon_kills'] / kills, 1)
+    stats['ability_kill_pct'] = round(100 * stats['ability_kills'] / kills, 1)
+    stats['first_blood_pct'] = round(100 * stats['first_bloods'] / rounds, 1)
+    stats['kast_pct'] = round(100 * stats['kast_rounds'] / rounds, 1)
+    stats['clutch_pct'] = round(100 * stats['clutch_wins'] / (stats['clutch_attempts'] or 1), 1)
+    for opponents in range(1, MAX_CLUTCH_OPPONENTS + 1):
+        attempts = stats[f'v{opponents}_attempts']
+        stats[f'1v{opponents}_pct'] = round(100 * stats[f'v{opponents}_wins'] / (attempts or 1), 1)
+    # Flexibility: how many distinct agents the player has been seen on
+    stats['flexibility'] = len(set(agents) - {'Unknown'})
+    stats['maps_played'] = len(set(maps) - {'Unknown'})
+    return stats
+
+
+class GamePartialCollector:
+    # Builds one game's PlayerPartial in a single pass over its events
+    def __init__(self, agent_mapping):
+        self.agent_mapping = agent_mapping
+        self.stats = defaultdict(lambda: [0] * len(COUNTER_FIELDS))
+        self.agents = {}
+        self.teams = {}
+        self.map_name = 'Unknown'
+        self.rounds = 0
+        self.round_active = False
+        self.first_kill_recorded = False
+        self.alive = defaultdict(int)
+        self.round_kills = defaultdict(int)
+
+    def handlers(self):
+        return {
+            'configuration': self.on_configuration,
+            'roundStarted': self.on_round_started,
+            'playerDied': self.on_player_died,
+            'damageEvent': self.on_damage,
+            'abilityUsed': self.on_ability_used,
+        }
+
+    def count(self, player_id, field, value=1):
+        if player_id is not None:
+            self.stats[player_id][COUNTER_INDEX[field]] += value
+
+    def on_configuration(self, configuration, event):
+        for player in configuration.get('players', []):
+            player_id = player.get('playerId', {}).get('value')
+            agent_guid = player.get('selectedAgent', {}).get('fallback', {}).get('guid', '').lower()
+            if player_id is not None and agent_guid:
+                self.agents[player_id] = self.agent_mapping.get(agent_guid, 'Unknown')
+        for team in configuration.get('teams', []):
+            team_id = team.get('teamId', {}).get('value')
+            for member in team.get('playersInTeam', []):
+                self.teams[member.get('value')] = team_id
+        selected_map = configuration.get('selectedMap', {}).get('fallback', {})
+        map_name = selected_map.get('displayName') or selected_map.get('guid')
+        if map_name:
+            self.map_name = map_name.rstrip('/').split('/')[-1]
+
+    def on_round_started(self, round_started, event):
+        self.rounds += 1
+        self.round_active = True
+        self.first_kill_recorded = False
+        self.round_kills.clear()
+        self.alive = defaultdict(int)
+        for team_id in self.teams.values():
+            self.alive[team_id] += 1
+
+    def on_player_died(self, player_died, event):
+        killer = player_died.get('killerId', {}).get('value')
+        victim = player_died.get('deceasedId', {}).get('value')
+
+        self.count(killer, 'kills')
+        self.count(victim, 'deaths')
+        for assistant in player_died.get('assistants', []):
+            self.count(assistant.get('assistantId', {}).get('value'), 'assists')
+
+        if 'weapon' in player_died:
+            self.count(killer, 'weapon_kills')
+        elif 'ability' in player_died:
+            self.count(killer, 'ability_kills')
+        else:
+            self.count(killer, 'other_kills')
+
+        if self.round_active and not self.first_kill_recorded:
+            self.count(killer, 'first_bloods')
+            self.count(victim, 'first_deaths')
+            self.first_kill_recorded = True
+
+        victim_team = self.teams.get(victim)
+        if killer is not None and killer != victim:
+            if victim_team is not None and self.teams.get(killer) != victim_team:
+                enemies_alive = min(max(self.alive[victim_team], 1), 5)
+                score = KILL_SCORE_BY_ENEMIES_ALIVE[enemies_alive]
+            else:
+                score = KILL_SCORE_BY_ENEMIES_ALIVE[5]
+            score += MULTI_KILL_BONUS * self.round_kills[killer]
+            self.round_kills[killer] += 1
+            self.count(killer, 'combat_score', score)
+        if victim_team is not None:
+            self.alive[victim_team] -= 1
+
+    def on_damage(self, damage_event, event):
+        causer = damage_event.get('causerId', {}).get('value')
+        amount = damage_event.get('damageAmount', 0)
+        self.count(causer, 'damage', amount)
+        self.count(causer, 'combat_score', amount)
+
+    def on_ability_used(self, ability_used, event):
+        self.count(ability_used.get('playerId', {}).get('value'), 'ability_uses')
+
+    def add_round_summary(self, summary):
+        # Fold KAST / trade / clutch counts from a RoundStateCollector into this game's stats
+        for player_id, round_stats in summary.items():
+            for field, value in round_stats.items():
+                if field in COUNTER_INDEX and field != 'rounds':
+                    self.count(player_id, field, value)
+
+    def to_partial(self, participant_mapping, tournament, team_mapping=None):
+        team_mapping = team_mapping or {}
+        partial = PlayerPartial()
+        players = set(self.stats) | set(self.agents)
+        for player_id in players:
+            esports_id = participant_mapping.get(str(player_id))
+            if esports_id is None:
+                continue
+            agent = self.agents.get(player_id, 'Unknown')
+            key = (esports_id, agent, get_agent_type(agent), self.map_name, tournament,
+                   team_mapping.get(str(self.teams.get(player_id))))
+            counters = self.stats[player_id]
+            counters[COUNTER_INDEX['games']] = 1
+            counters[COUNTER_INDEX['rounds']] = self.rounds
+            partial.counters[key] = list(counters)
+        return partial
+
+
+# Per-process state for building partials
+catalog = None
+
+
+def init_worker(event):
+    global catalog
+    if catalog is None:
+        catalog = ReferenceCatalog.load(event)
+
+
+def game_partial(game_path):
+    game_file = os.path.basename(game_path)
+    game_id = f"val:{game_file.split('_')[1].replace('.json', '')}"
+    game_mappings = catalog.game(game_id)
+    if not game_mappings:
+        raise ValueError(f"No mapping data found for {game_id}")
+    tournament = catalog.tournament(game_mappings.get('tournamentId'))
+    tournament_name = tournament['name'] if tournament else 'Unknown'
+
+    collector = GamePartialCollector(catalog.agent_mapping)
+    round_state = RoundStateCollector()
+    EventDispatcher([collector, round_state]).run(iter_game_events(game_path))
+    round_state.finish()
+    collector.add_round_summary(round_state.player_summary())
+    return collector.to_partial(game_mappings.get('participantMapping', {}), tournament_name,
+                                game_mappings.get('teamMapping', {}))
+
+
+def cached_game_partial(job):
+    # Build (or reuse) the cached partial for one game; returns its JSON rows
+    game_path, partial_path = job
+    stat = os.stat(game_path)
+    fingerprint = [AGGREGATES_VERSION, catalog.fingerprint, stat.st_size, stat.st_mtime_ns]
+    if os.path.isfile(partial_path):
+        with open(partial_path, "r") as partial_file:
+            cached = jsonBackend.load(partial_file)
+        if cached['fingerprint'] == fingerprint:
+            return cached['rows']
+
+    rows = game_partial(game_path).to_json()
+    temp_path = f"{partial_path}.part"
+    with open(temp_path, "w") as partial_file:
+        json.dump({'fingerprint': fingerprint, 'rows': rows}, partial_file)
+    os.replace(temp_path, partial_path)
+    return rows
+
+
+def iter_game_partials(year, event, workers=1):
+    # (game file, cached partial JSON rows) for every game of the league-year, in file order
+    init_worker(event)
+    games_dir = f"{event}/games/{year}"
+    partials_dir = f"{event}/aggregates/{year}"
+    os.makedirs(partials_dir, exist_ok=True)
+    game_files = sorted(game_file for game_file in os.listdir(games_dir) if game_file.endswith(".json"))
+    jobs = [(os.path.join(games_dir, game_file), os.path.join(partials_dir, game_file)) for game_file in game_files]
+
+    if workers > 1:
+        with ProcessPoolExecutor(workers, initializer=init_worker, initargs=(event,)) as executor:
+            yield from zip(game_files, executor.map(cached_game_partial, jobs, chunksize=8))
+        return
+    for game_file, job in zip(game_files, jobs):
+        yield game_file, cached_game_partial(job)
+
+
+def season_partial(year, event, workers=1):
+    return merge_partials(PlayerPartial.from_json(rows) for _, rows in iter_game_partials(year, event, workers))
+
+
+def leaderboard(partial, by=('player',), metric='acs', top=20, min_rounds=0):
+    rows = []
+    for group_key, group in partial.rollup(by).items():
+        stats = derived_metrics(group['counters'], group['agents'], group['maps'])
+        if stats['rounds'] < min_rounds:
+            continue
+        stats.update(zip(by, group_key))
+        rows.append(stats)
+    rows.sort(key=lambda row: row[metric], reverse=True)
+    return rows[:top]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Season-wide player leaderboards from mergeable per-game aggregates.")
+    parser.add_argument('year', help="Example: 2024")
+    parser.add_argument('event', help="Example: vct-international")
+    parser.add_argument('--by', default='player', help="Comma-separated grouping, from: " + ", ".join(KEY_FIELDS))
+    parser.add_argument('--metric', default='acs', help="Metric to rank by (e.g. acs, kd, first_bloods, flexibility).")
+    parser.add_argument('--top', type=int, default=20, help="Number of rows to show (default: 20).")
+    parser.add_argument('--min-rounds', type=int, default=0, help="Ignore groups with fewer rounds played.")
+    parser.add_argument('--workers', type=int, default=1, help="Number of games aggregated in parallel (default: 1).")
+    args = parser.parse_args()
+
+    by = tuple(field.strip() for field in args.by.split(','))
+    partial = season_partial(args.year, args.event, args.workers)
+    for row in leaderboard(partial, by, args.metric, args.top, args.min_rounds):
+        if 'player' in row:
+            player = catalog.player(row['player'])
+            row['handle'] = player['handle'] if player else row['player']
+        label = ", ".join(str(row.get('handle' if field == 'player' else field)) for field in by)
+        print(f"{label}: {args.metric}={row[args.metric]} (rounds={row['rounds']}, acs={row['acs']}, kd={row['kd']})")
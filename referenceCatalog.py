@@ -0,0 +1,152 @@
+import os
+import pickle
+import hashlib
+import jsonBackend
+
+# Reference data for a league (leagues, tournaments, players, teams,
+# mapping_data and agent.txt) loaded once and indexed for O(1) lookups.
+# The indexed catalog is pickled next to the source files and reused
+# until any of them changes.
+
+CATALOG_CACHE_FILE = "catalog.pickle"
+CATALOG_VERSION = 1
+
+# Agent type classification
+agent_type_mapping = {
+    "Duelist": ["Jett", "Reyna", "Raze", "Yoru", "Phoenix", "Neon", "Iso"],
+    "Controller": ["Omen", "Brimstone", "Astra", "Viper", "Harbor"],
+    "Sentinel": ["Killjoy", "Cypher", "Sage", "Chamber", "Deadlock"],
+    "Initiator": ["Breach", "Skye", "Sova", "Kayo", "Fade", "Gekko"]
+}
+
+agent_types_by_name = {agent: agent_type for agent_type, agents in agent_type_mapping.items() for agent in agents}
+
+
+# Function to determine agent type
+def get_agent_type(agent_name):
+    return agent_types_by_name.get(agent_name, 'Unknown')  # Default if agent type is not found
+
+
+def first_by_id(records):
+    # Keep the first record per id, matching a pandas lookup's .values[0]
+    index = {}
+    for record in records:
+        index.setdefault(record.get('id'), record)
+    return index
+
+
+class ReferenceCatalog:
+    def __init__(self, leagues, tournaments, players, teams, mapping_data, agent_mapping):
+        self.leagues = leagues
+        self.tournaments = tournaments
+        self.players = players
+        self.teams = teams
+        self.mapping_data = mapping_data
+        self.agent_mapping = agent_mapping
+
+        self.leagues_by_id = {league.get('league_id'): league for league in leagues}
+        self.tournaments_by_id = first_by_id(tournaments)
+        self.teams_by_id = first_by_id(teams)
+        self.games_by_platform_id = {}
+        for game in mapping_data:
+            self.games_by_platform_id.setdefault(game['platformGameId'], game)
+
+        # players.json contains repeated ids; keep every record in file order
+        self.player_records_by_id = {}
+        for player in players:
+            self.player_records_by_id.setdefault(player.get('id'), []).append(player)
+
+        # Column order pandas would infer for a DataFrame of the players list
+        self.player_columns = list(dict.fromkeys(key for player in players for key in player))
+
+    @classmethod
+    def load(cls, event, use_cache=True):
+        directory = f"{event}/esports-data"
+        sources = {
+            'leagues': f"{directory}/leagues.json",
+            'tournaments': f"{directory}/tournaments.json",
+            'players': f"{directory}/players.json",
+            'teams': f"{directory}/teams.json",
+            'mapping_data': f"{directory}/mapping_data.json",
+            'agent_mapping': f"{directory}/agent.txt",
+        }
+        fingerprint = (CATALOG_VERSION, tuple(source_fingerprint(path) for path in sources.values()))
+        cache_path = f"{directory}/{CATALOG_CACHE_FILE}"
+
+        if use_cache and os.path.isfile(cache_path):
+            try:
+                with open(cache_path, "rb") as cache_file:
+                    cached_fingerprint, catalog = pickle.load(cache_file)
+                if cached_fingerprint == fingerprint:
+                    catalog.fingerprint = catalog_digest(fingerprint)
+                    return catalog
+            except (pickle.UnpicklingError, EOFError, AttributeError, ImportError, ValueError):
+                pass
+
+        data = {}
+        for name, path in sources.items():
+            if os.path.isfile(path):
+                with open(path, "r", encoding="utf-8") as source_file:
+                    data[name] = jsonBackend.load(source_file)
+            elif name in ('leagues', 'tournaments'):
+                data[name] = []
+            else:
+                raise FileNotFoundError(path)
+        catalog = cls(**data)
+        catalog.fingerprint = catalog_digest(fingerprint)
+
+        if use_cache:
+            save_catalog_cache(cache_path, fingerprint, catalog)
+        return catalog
+
+    def game(self, platform_game_id):
+        return self.games_by_platform_id.get(platform_game_id)
+
+    def player(self, player_id):
+        records = self.player_records_by_id.get(player_id)
+        return records[0] if records else None
+
+    def player_records(self, player_id):
+        return self.player_records_by_id.get(player_id, [])
+
+    def team(self, team_id):
+        return self.teams_by_id.get(team_id)
+
+    def team_name(self, team_id, default='Unknown'):
+        team = self.teams_by_id.get(team_id)
+        return team['name'] if team is not None else default
+
+    def tournament(self, tournament_id):
+        return self.tournaments_by_id.get(tournament_id)
+
+    def league(self, league_id):
+        return self.leagues_by_id.get(league_id)
+
+    def agent_name(self, agent_guid, default='Unknown'):
+        return self.agent_mapping.get(agent_guid.lower(), default)
+
+
+def save_catalog_cache(cache_path, fingerprint, catalog):
+    # Worker processes may build the same catalog at once, so each writes its own temp file;
+    # the catalog is already in memory, so a failed write only costs the next load a rebuild
+    temp_path = f"{cache_path}.{os.getpid()}.part"
+    try:
+        with open(temp_path, "wb") as cache_file:
+            pickle.dump((fingerprint, catalog), cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, cache_path)
+    except OSError as error:
+        print(f"Could not cache the reference catalog in {cache_path}: {error}")
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def source_fingerprint(path):
+    if not os.path.isfile(path):
+        return (path, None, None)
+    stat = os.stat(path)
+    return (path, stat.st_size, stat.st_mtime_ns)
+
+
+def catalog_digest(fingerprint):
+    # Short stable id for the reference data a catalog was built from
+    return hashlib.sha256(repr(fingerprint).encode()).hexdigest()[:16]
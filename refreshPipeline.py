@@ -0,0 +1,212 @@
+import os
+import sys
+import time
+import queue
+import threading
+import argparse
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, wait
+import dataExtractor
+import matchDetails4
+from pipelineMetrics import PipelineMetrics
+
+# One command to refresh several leagues and years end to end. Downloads
+# (dataExtractor, threads) and processing (matchDetails4, processes) run as
+# a producer/consumer pipeline:
+#
+#   download threads --[ready queue, bounded]--> feeder --[bounded in flight]--> process pool
+#
+# Each game is handed to processing as soon as its download finishes (or
+# straight away when it is already on disk), so a refresh takes about as
+# long as the slower stage instead of the sum of both. A full ready queue
+# blocks the downloaders, so a slow processing stage never lets downloads
+# pile up in memory or on the to-do list. 'handoff_wait' in the metrics is
+# time downloads spent blocked on processing, 'process_starved' time
+# processing spent waiting for downloads. Games that could not be downloaded
+# are reported as failures along with the ones that failed to process.
+
+QUEUE_GAMES = 32
+DONE = None
+
+# Per-process settings for process_downloaded_game, set by init_process
+use_vectorized = False
+collect_metrics = False
+previous_state = None
+
+
+def init_process(vectorized, metrics_enabled, incremental_state):
+    global use_vectorized, collect_metrics, previous_state
+    use_vectorized = vectorized
+    collect_metrics = metrics_enabled
+    previous_state = incremental_state
+
+
+def process_downloaded_game(job):
+    # Returns (job, state key, state entry, error, stage metrics); no entry and no error means skipped
+    year, league, game_file = job
+    matchDetails4.init_worker(year, league, use_vectorized, collect_metrics)
+    state_key = os.path.join(matchDetails4.games_dir, game_file)
+    # Taken before processing, so a file changed meanwhile is not recorded as done
+    fingerprint = matchDetails4.game_fingerprint(game_file)
+    if previous_state is not None and matchDetails4.is_up_to_date(game_file, previous_state, fingerprint):
+        return job, state_key, None, None, None
+    _, output, error, game_metrics = matchDetails4.process_game_safely(game_file)
+    entry = {'fingerprint': fingerprint, 'output': output} if error is None else None
+    return job, state_key, entry, error, game_metrics
+
+
+def download_stage(leagues, years, workers, ready, metrics, download_failures, tournaments=None, teams=None):
+    # Producer: download every league-year (only the games of `tournaments` and `teams`, if given),
+    # handing each finished game to `ready`; games still not on disk afterwards go to `download_failures`
+    def hand_off(year, league, s3_game_file, manifest):
+        local_file = dataExtractor.local_name(s3_game_file)
+        if not dataExtractor.is_downloaded(local_file, manifest):
+            download_failures.append(local_file)
+            return
+        with metrics.timed('handoff_wait', items=1):
+            ready.put((year, league, os.path.basename(local_file)))
+
+    try:
+        for league in leagues:
+            dataExtractor.download_esports_files(league)
+            games = dataExtractor.select_games(league, tournaments, teams)
+            if games is None:
+                continue
+            manifest = dataExtractor.load_manifest(league)
+            try:
+                for year in years:
+                    os.makedirs(f"{league}/games/{year}", exist_ok=True)
+                    with ThreadPoolExecutor(max_workers=workers) as executor:
+                        pending = {}
+                        for s3_game_file in [f"{league}/games/{year}/{game['platformGameId']}" for game in games]:
+                            if len(pending) >= workers * 2:
+                                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                                for future in done:
+                                    future.result()
+                                    hand_off(year, league, pending.pop(future), manifest)
+                            pending[executor.submit(dataExtractor.download_gzip_and_write_to_json,
+                                                    s3_game_file, manifest)] = s3_game_file
+                        for future in wait(pending).done:
+                            future.result()
+                            hand_off(year, league, pending[future], manifest)
+            finally:
+                dataExtractor.save_manifest(league, manifest)
+    finally:
+        ready.put(DONE)
+
+
+def run_pipeline(leagues, years, download_workers=8, process_workers=4, vectorized=False, incremental=False,
+                 queue_games=QUEUE_GAMES, metrics=None, tournaments=None, teams=None):
+    # Returns (processed, skipped, failures)
+    metrics = metrics or PipelineMetrics()
+    state = matchDetails4.load_processing_state()
+    ready = queue.Queue(maxsize=queue_games)
+    results = queue.Queue()
+    slots = threading.BoundedSemaphore(process_workers * 2)
+    download_error = []
+    download_failures = []
+
+    executor = ProcessPoolExecutor(process_workers, initializer=init_process,
+                                   initargs=(vectorized, True, dict(state) if incremental else None))
+    # Fork every worker now, before the download threads start
+    executor.submit(int).result()
+
+    def download():
+        try:
+            download_stage(leagues, years, download_workers, ready, metrics, download_failures, tournaments, teams)
+        except BaseException as error:
+            download_error.append(error)
+
+    def feed():
+        # Consumer side: move downloaded games into the pool without overfilling it
+        submitted = 0
+        while True:
+            with metrics.timed('process_starved'):
+                job = ready.get()
+            if job is DONE:
+                break
+            slots.acquire()
+            future = executor.submit(process_downloaded_game, job)
+            future.add_done_callback(lambda future, job=job: (slots.release(), results.put((job, future))))
+            submitted += 1
+        results.put(submitted)
+
+    threads = [threading.Thread(target=download, daemon=True), threading.Thread(target=feed, daemon=True)]
+    for thread in threads:
+        thread.start()
+
+    processed, skipped, failures = 0, 0, []
+    finished, submitted = 0, None
+    try:
+        while submitted is None or finished < submitted:
+            item = results.get()
+            if isinstance(item, int):
+                submitted = item
+                continue
+            finished += 1
+            (year, league, game_file), future = item
+            try:
+                _, state_key, entry, error, game_metrics = future.result()
+            except Exception as worker_error:
+                # e.g. the league's reference data could not be loaded
+                state_key, entry, error, game_metrics = f"{league}/games/{year}/{game_file}", None, repr(worker_error), None
+            metrics.merge(game_metrics)
+            if error is not None:
+                print(f"Failed to process {state_key}: {error}")
+                failures.append(state_key)
+            elif entry is None:
+                skipped += 1
+            else:
+                state[state_key] = entry
+                processed += 1
+    finally:
+        executor.shutdown(cancel_futures=True)
+        matchDetails4.save_processing_state(state)
+        metrics.merge(dataExtractor.metrics.drain())
+
+    if download_error:
+        raise download_error[0]
+    for state_key in download_failures:
+        print(f"Failed to download {state_key}")
+    return processed, skipped, download_failures + failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Download and process several leagues and years as one pipeline.")
+    parser.add_argument('--leagues', nargs='+', default=["game-changers", "vct-challengers", "vct-international"])
+    parser.add_argument('--years', nargs='+', type=int, default=[2022, 2023, 2024])
+    parser.add_argument('--tournament', nargs='+', help="Only games of these tournaments (id or name from tournaments.json).")
+    parser.add_argument('--team', nargs='+', help="Only games involving these teams (id, name, acronym or slug from teams.json).")
+    parser.add_argument('--download-workers', type=int, default=8, help="Concurrent downloads (default: 8).")
+    parser.add_argument('--process-workers', type=int, default=4, help="Games processed in parallel (default: 4).")
+    parser.add_argument('--queue-games', type=int, default=QUEUE_GAMES,
+                        help=f"Downloaded games allowed to wait for processing (default: {QUEUE_GAMES}).")
+    parser.add_argument('--vectorized', action='store_true', help="Process with the vectorized columnar path.")
+    parser.add_argument('--incremental', action='store_true', help="Skip games whose outputs are up to date.")
+    parser.add_argument('--bucket-url', default=os.getenv("S3_BUCKET_URL", dataExtractor.S3_BUCKET_URL))
+    parser.add_argument('--no-cache', action='store_true', help="Download everything directly, bypassing the shared cache.")
+    parser.add_argument('--metrics-log', help="Append this run's stage metrics as a JSON line to this file.")
+    parser.add_argument('--metrics-summary', action='store_true', help="Print a per-stage timing summary at the end of the run.")
+    args = parser.parse_args()
+
+    dataExtractor.S3_BUCKET_URL = args.bucket_url
+    if args.no_cache:
+        dataExtractor.BLOB_CACHE_DIR = None
+
+    run_metrics = PipelineMetrics()
+    start_time = time.perf_counter()
+    processed, skipped, failures = run_pipeline(args.leagues, args.years, args.download_workers, args.process_workers,
+                                                args.vectorized, args.incremental, args.queue_games, run_metrics,
+                                                args.tournament, args.team)
+    print(f"Processed {processed} games ({skipped} up to date, {len(failures)} failed) "
+          f"in {time.perf_counter() - start_time:.2f}s")
+
+    run_info = {'command': 'refreshPipeline', 'leagues': args.leagues, 'years': args.years,
+                'tournament': args.tournament, 'team': args.team,
+                'download_workers': args.download_workers, 'process_workers': args.process_workers,
+                'vectorized': args.vectorized, 'processed': processed, 'failures': len(failures)}
+    if args.metrics_log:
+        run_metrics.write_log(args.metrics_log, **run_info)
+    if args.metrics_summary:
+        print(run_metrics.summary(**run_info))
+    if failures:
+        sys.exit(1)
@@ -0,0 +1,170 @@
+import json
+import os
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import jsonBackend
+from gameEvents import iter_game_event_spans
+from columnarStore import source_fingerprint
+
+# Sidecar index for random access into a game file, built once per game:
+#
+#   {event}/roundIndex/{year}/{game}.json
+#
+# For every configuration event and every round (a roundStarted event up to
+# the next one, or the end of the file) it records the byte range and the
+# range of event positions in the file's event array. Events before the
+# first roundStarted are kept as the 'pregame' span. A reader seeks to one
+# span and decodes only those bytes.
+
+ROUND_INDEX_VERSION = 1
+
+
+def round_index_dir(event, year):
+    return f"{event}/roundIndex/{year}"
+
+
+def default_index_path(game_path):
+    # {event}/games/{year}/{game}.json -> {event}/roundIndex/{year}/{game}.json, for any relative or absolute path
+    year_dir = os.path.dirname(os.path.abspath(game_path))
+    event_dir = os.path.dirname(os.path.dirname(year_dir))
+    return os.path.join(round_index_dir(event_dir, os.path.basename(year_dir)), os.path.basename(game_path))
+
+
+def build_round_index(game_path):
+    configurations = []
+    rounds = []
+    pregame = None
+    events = 0
+    last_end = 0
+    first_start = 0
+    for position, (event, start, end) in enumerate(iter_game_event_spans(game_path)):
+        if position == 0:
+            first_start = start
+        if 'roundStarted' in event:
+            if rounds:
+                rounds[-1].update(end=last_end, end_event=position)
+            elif position:
+                pregame = {'start': first_start, 'end': last_end, 'event': 0, 'end_event': position}
+            rounds.append({'round': event['roundStarted'].get('roundNumber', len(rounds)), 'start': start,
+                           'event': position})
+        elif 'configuration' in event:
+            configurations.append({'start': start, 'end': end, 'event': position})
+        last_end = end
+        events = position + 1
+
+    if rounds:
+        rounds[-1].update(end=last_end, end_event=events)
+    elif events:
+        pregame = {'start': first_start, 'end': last_end, 'event': 0, 'end_event': events}
+    return {'version': ROUND_INDEX_VERSION, 'source': source_fingerprint(game_path), 'events': events,
+            'pregame': pregame, 'configurations': configurations, 'rounds': rounds}
+
+
+def write_round_index(game_path, index_path):
+    index = build_round_index(game_path)
+    temp_path = f"{index_path}.part"
+    with open(temp_path, "w") as index_file:
+        json.dump(index, index_file)
+    os.replace(temp_path, index_path)
+    return index
+
+
+def load_round_index(game_path, index_path):
+    # The saved index when it matches the game file, else None
+    if not os.path.isfile(index_path):
+        return None
+    with open(index_path, "r") as index_file:
+        index = jsonBackend.load(index_file)
+    if index.get('version') != ROUND_INDEX_VERSION or index.get('source') != source_fingerprint(game_path):
+        return None
+    return index
+
+
+class IndexedGame:
+    # Seek-and-decode reader over one game file and its round index
+    def __init__(self, game_path, index_path=None):
+        self.game_path = game_path
+        if index_path is None:
+            index_path = default_index_path(game_path)
+        self.index = load_round_index(game_path, index_path)
+        if self.index is None:
+            os.makedirs(os.path.dirname(index_path), exist_ok=True)
+            self.index = write_round_index(game_path, index_path)
+        self.rounds_by_number = {entry['round']: entry for entry in self.index['rounds']}
+
+    def read_span(self, start, end):
+        with open(self.game_path, "rb") as game_file:
+            game_file.seek(start)
+            return game_file.read(end - start)
+
+    def decode_span(self, span):
+        # A span is "{...},{...}...{...}"; wrapping it in brackets makes it a JSON array
+        if span is None:
+            return []
+        return jsonBackend.loads(b"[" + self.read_span(span['start'], span['end']) + b"]")
+
+    def round_numbers(self):
+        return list(self.rounds_by_number)
+
+    def round_events(self, round_number):
+        # Every event from roundStarted of round_number up to the next roundStarted
+        return self.decode_span(self.rounds_by_number[round_number])
+
+    def round_containing(self, position):
+        # Index entry of the round holding the event at `position` (None for pregame events)
+        for entry in self.index['rounds']:
+            if entry['event'] <= position < entry['end_event']:
+                return entry
+        return None
+
+    def configurations(self):
+        return [jsonBackend.loads(self.read_span(entry['start'], entry['end'])) for entry in self.index['configurations']]
+
+    def pregame_events(self):
+        return self.decode_span(self.index['pregame'])
+
+    def event(self, position):
+        # The event at `position` in the game's event array, decoding only its round
+        span = self.round_containing(position) or self.index['pregame']
+        return self.decode_span(span)[position - span['event']]
+
+
+def index_if_needed(args):
+    game_path, index_path = args
+    if load_round_index(game_path, index_path) is not None:
+        return False
+    write_round_index(game_path, index_path)
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build round-offset indexes for a league-year, or read one round.")
+    parser.add_argument('year', help="Example: 2024")
+    parser.add_argument('event', help="Example: vct-international")
+    parser.add_argument('--workers', type=int, default=1, help="Number of games indexed in parallel (default: 1).")
+    parser.add_argument('--game', help="Game file name (e.g. val_....json) to read from instead of indexing.")
+    parser.add_argument('--round', type=int, help="With --game: round number to decode.")
+    args = parser.parse_args()
+
+    games_dir = f"{args.event}/games/{args.year}"
+    output_dir = round_index_dir(args.event, args.year)
+    os.makedirs(output_dir, exist_ok=True)
+
+    if args.game:
+        start_time = time.perf_counter()
+        game = IndexedGame(os.path.join(games_dir, args.game), os.path.join(output_dir, args.game))
+        events = game.round_events(args.round) if args.round is not None else game.configurations()
+        elapsed_ms = (time.perf_counter() - start_time) * 1000
+        what = f"round {args.round}" if args.round is not None else "configuration"
+        print(f"{args.game} {what}: {len(events)} events decoded in {elapsed_ms:.1f} ms "
+              f"({len(game.index['rounds'])} rounds, {game.index['events']} events in the file)")
+    else:
+        jobs = [(os.path.join(games_dir, game_file), os.path.join(output_dir, game_file))
+                for game_file in sorted(os.listdir(games_dir)) if game_file.endswith(".json")]
+        if args.workers > 1:
+            with ProcessPoolExecutor(args.workers) as executor:
+                results = list(executor.map(index_if_needed, jobs))
+        else:
+            results = [index_if_needed(job) for job in jobs]
+        print(f"Indexed {sum(results)} of {len(jobs)} games into {output_dir}")
@@ -0,0 +1,224 @@
+import math
+import argparse
+import os
+from collections import defaultdict
+from gameEvents import iter_game_events, event_game_time
+from statCollectors import EventDispatcher
+
+# Per-round state machine for KAST, trades and 1vX clutches, run in the
+# same single pass as the other stat collectors.
+#
+# Players are given a slot (0..N-1) from the configuration event so that
+# per-round state is a handful of integers: an alive bitmask per team and
+# kill / assist / survive / traded bitmasks over all slots. Each finished
+# round emits one RoundRecord and zero or more ClutchRecords.
+
+# A death counts as traded when a teammate kills its killer within this many seconds
+TRADE_WINDOW_SECONDS = 5.0
+MAX_CLUTCH_OPPONENTS = 5
+
+
+class RoundRecord:
+    __slots__ = ('round_number', 'winning_team', 'kast_mask', 'traded_mask')
+
+    def __init__(self, round_number, winning_team, kast_mask, traded_mask):
+        self.round_number = round_number
+        self.winning_team = winning_team
+        self.kast_mask = kast_mask
+        self.traded_mask = traded_mask
+
+
+class ClutchRecord:
+    __slots__ = ('round_number', 'player_id', 'team_id', 'opponents', 'won', 'game_time')
+
+    def __init__(self, round_number, player_id, team_id, opponents, won, game_time=math.nan):
+        self.round_number = round_number
+        self.player_id = player_id
+        self.team_id = team_id
+        self.opponents = opponents
+        self.won = won
+        # When the player was left alone
+        self.game_time = game_time
+
+
+def popcount(mask):
+    return bin(mask).count("1")
+
+
+class RoundStateCollector:
+    def __init__(self):
+        self.slots = {}            # player id -> slot
+        self.player_ids = []       # slot -> player id
+        self.team_of_slot = []     # slot -> team id
+        self.team_masks = {}       # team id -> bitmask of its slots
+
+        self.round_records = []
+        self.clutch_records = []
+        self.in_round = False
+
+    def handlers(self):
+        return {
+            'configuration': self.on_configuration,
+            'roundStarted': self.on_round_started,
+            'playerDied': self.on_player_died,
+            'roundEnded': self.on_round_ended,
+            'roundDecided': self.on_round_decided,
+        }
+
+    def slot(self, player_id):
+        slot = self.slots.get(player_id)
+        if slot is None:
+            slot = self.slots[player_id] = len(self.player_ids)
+            self.player_ids.append(player_id)
+            self.team_of_slot.append(None)
+        return slot
+
+    def on_configuration(self, configuration, event):
+        for player in configuration.get('players', []):
+            player_id = player.get('playerId', {}).get('value')
+            if player_id is not None:
+                self.slot(player_id)
+        for team in configuration.get('teams', []):
+            team_id = team.get('teamId', {}).get('value')
+            for member in team.get('playersInTeam', []):
+                player_id = member.get('value')
+                if player_id is None:
+                    continue
+                slot = self.slot(player_id)
+                self.team_of_slot[slot] = team_id
+                self.team_masks[team_id] = self.team_masks.get(team_id, 0) | (1 << slot)
+
+    def on_round_started(self, round_started, event):
+        if self.in_round:
+            self.finish_round(None)
+        self.in_round = True
+        self.round_number = round_started.get('roundNumber')
+        self.alive = dict(self.team_masks)
+        self.kill_mask = 0
+        self.assist_mask = 0
+        self.traded_mask = 0
+        # (victim slot, killer slot, game time) of deaths that can still be traded
+        self.pending_trades = []
+        self.clutches = {}         # team id -> (slot, opponents, game time) once a player is left alone
+
+    def on_player_died(self, player_died, event):
+        if not self.in_round:
+            return
+        killer_id = player_died.get('killerId', {}).get('value')
+        victim_id = player_died.get('deceasedId', {}).get('value')
+        if victim_id is None:
+            return
+        victim = self.slot(victim_id)
+        killer = self.slot(killer_id) if killer_id is not None else None
+        game_time = event_game_time(event)
+
+        if killer is not None and killer != victim:
+            self.kill_mask |= 1 << killer
+        for assistant in player_died.get('assistants', []):
+            assistant_id = assistant.get('assistantId', {}).get('value')
+            if assistant_id is not None:
+                self.assist_mask |= 1 << self.slot(assistant_id)
+
+        # The victim's own earlier kills are traded if they happened within the window and
+        # a teammate of the earlier victim got the kill; otherwise those deaths stay untraded
+        if not math.isnan(game_time):
+            killer_team = self.team_of_slot[killer] if killer is not None and killer != victim else None
+            still_pending = []
+            for pending_victim, pending_killer, death_time in self.pending_trades:
+                if game_time - death_time > TRADE_WINDOW_SECONDS:
+                    continue
+                if pending_killer == victim:
+                    if killer_team is not None and killer_team == self.team_of_slot[pending_victim]:
+                        self.traded_mask |= 1 << pending_victim
+                else:
+                    still_pending.append((pending_victim, pending_killer, death_time))
+            self.pending_trades = still_pending
+            # Team kills cannot be traded
+            if killer_team is not None and killer_team != self.team_of_slot[victim]:
+                self.pending_trades.append((victim, killer, game_time))
+
+        victim_team = self.team_of_slot[victim]
+        if victim_team in self.alive:
+            self.alive[victim_team] &= ~(1 << victim)
+        self.check_clutches(game_time)
+
+    def check_clutches(self, game_time=math.nan):
+        for team_id, alive_mask in self.alive.items():
+            if team_id in self.clutches or popcount(alive_mask) != 1:
+                continue
+            opponents = sum(popcount(mask) for other, mask in self.alive.items() if other != team_id)
+            if opponents >= 1:
+                self.clutches[team_id] = (alive_mask.bit_length() - 1, min(opponents, MAX_CLUTCH_OPPONENTS), game_time)
+
+    def on_round_ended(self, round_ended, event):
+        if self.in_round:
+            self.finish_round(round_ended.get('winningTeam', {}).get('value'))
+
+    def on_round_decided(self, round_decided, event):
+        if self.in_round:
+            self.finish_round(round_decided.get('result', {}).get('winningTeam', {}).get('value'))
+
+    def finish_round(self, winning_team):
+        self.in_round = False
+        if winning_team is None:
+            # Without an end event the team with players left standing took the round
+            standing = [team_id for team_id, mask in self.alive.items() if mask]
+            winning_team = standing[0] if len(standing) == 1 else None
+
+        survived_mask = 0
+        for mask in self.alive.values():
+            survived_mask |= mask
+        kast_mask = self.kill_mask | self.assist_mask | survived_mask | self.traded_mask
+        self.round_records.append(RoundRecord(self.round_number, winning_team, kast_mask, self.traded_mask))
+
+        for team_id, (slot, opponents, game_time) in self.clutches.items():
+            self.clutch_records.append(ClutchRecord(self.round_number, self.player_ids[slot], team_id,
+                                                    opponents, winning_team == team_id, game_time))
+
+    def finish(self):
+        # Close a round the file ended in the middle of
+        if self.in_round:
+            self.finish_round(None)
+
+    def player_summary(self):
+        # Per player id: rounds, kast_rounds, traded_deaths, clutch attempts/wins overall and per 1vX
+        summary = defaultdict(lambda: defaultdict(int))
+        for record in self.round_records:
+            for slot, player_id in enumerate(self.player_ids):
+                bit = 1 << slot
+                stats = summary[player_id]
+                stats['rounds'] += 1
+                if record.kast_mask & bit:
+                    stats['kast_rounds'] += 1
+                if record.traded_mask & bit:
+                    stats['traded_deaths'] += 1
+        for clutch in self.clutch_records:
+            stats = summary[clutch.player_id]
+            stats['clutch_attempts'] += 1
+            stats[f'v{clutch.opponents}_attempts'] += 1
+            if clutch.won:
+                stats['clutch_wins'] += 1
+                stats[f'v{clutch.opponents}_wins'] += 1
+        return summary
+
+
+def game_round_state(game_path):
+    collector = RoundStateCollector()
+    EventDispatcher([collector]).run(iter_game_events(game_path))
+    collector.finish()
+    return collector
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Print per-player KAST and clutch stats for one game file.")
+    parser.add_argument('game_path', help="Path to a game JSON file")
+    args = parser.parse_args()
+
+    collector = game_round_state(args.game_path)
+    print(f"{os.path.basename(args.game_path)}: {len(collector.round_records)} rounds, {len(collector.clutch_records)} clutch situations")
+    for player_id, stats in sorted(collector.player_summary().items(), key=lambda item: str(item[0])):
+        rounds = stats['rounds'] or 1
+        clutches = ", ".join(f"1v{opponents} {stats[f'v{opponents}_wins']}/{stats[f'v{opponents}_attempts']}"
+                             for opponents in range(1, MAX_CLUTCH_OPPONENTS + 1) if stats[f'v{opponents}_attempts'])
+        print(f"player {player_id}: KAST {round(100 * stats['kast_rounds'] / rounds, 1)}%, "
+              f"clutches {stats['clutch_wins']}/{stats['clutch_attempts']}" + (f" ({clutches})" if clutches else ""))
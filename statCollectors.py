@@ -0,0 +1,173 @@
+import time
+from collections import defaultdict
+
+# Stat collectors register a handler per event type they care about
+# (playerDied, damageEvent, configuration, roundStarted, ...). The
+# dispatcher reads each event's type key once and calls only the handlers
+# routed to it, so adding a stat costs nothing on the other event types.
+#
+# Handlers are called as handler(payload, event), where payload is the
+# body under the type key and event is the whole event (for metadata).
+#
+# Given a PipelineMetrics, the dispatcher also records the time spent
+# decoding events ('parse') and in each collector's handlers
+# ('collector.<Name>', items = events handled). Without one, handlers are
+# called directly and nothing is timed.
+
+
+class EventDispatcher:
+    def __init__(self, collectors, metrics=None):
+        self.metrics = metrics
+        self.handler_totals = {}
+        routes = defaultdict(list)
+        for collector in collectors:
+            for event_type, handler in collector.handlers().items():
+                if metrics is not None:
+                    handler = self.timed_handler(handler, f"collector.{type(collector).__name__}")
+                routes[event_type].append(handler)
+        self.routes = {event_type: tuple(handlers) for event_type, handlers in routes.items()}
+
+    def timed_handler(self, handler, stage):
+        # [seconds, events]; kept locally and flushed to metrics once per run
+        totals = self.handler_totals.setdefault(stage, [0.0, 0])
+        counter = time.perf_counter
+
+        def timed(payload, event):
+            start = counter()
+            handler(payload, event)
+            totals[0] += counter() - start
+            totals[1] += 1
+        return timed
+
+    def dispatch(self, event):
+        routes = self.routes
+        for key in event:
+            handlers = routes.get(key)
+            if handlers is not None:
+                payload = event[key]
+                for handler in handlers:
+                    handler(payload, event)
+                return
+
+    def run(self, events):
+        dispatch = self.dispatch
+        if self.metrics is None:
+            for event in events:
+                dispatch(event)
+            return
+
+        counter = time.perf_counter
+        iterator = iter(events)
+        parse_seconds = 0.0
+        parsed = 0
+        while True:
+            start = counter()
+            event = next(iterator, None)
+            parse_seconds += counter() - start
+            if event is None:
+                break
+            parsed += 1
+            dispatch(event)
+        self.metrics.add('parse', parse_seconds, items=parsed)
+        for stage, totals in self.handler_totals.items():
+            self.metrics.add(stage, totals[0], items=totals[1])
+            totals[0], totals[1] = 0.0, 0
+
+
+class AgentCollector:
+    # Maps each player to the agent (and agent type) picked in the configuration event
+    def __init__(self, player_stats, agent_mapping, get_agent_type):
+        self.player_stats = player_stats
+        self.agent_mapping = agent_mapping
+        self.get_agent_type = get_agent_type
+
+    def handlers(self):
+        return {"configuration": self.on_configuration}
+
+    def on_configuration(self, configuration, event):
+        for player in configuration.get('players', []):
+            player_id = player.get('playerId', {}).get('value', None)
+            agent_guid = player.get('selectedAgent', {}).get('fallback', {}).get('guid', '').lower()
+            if player_id is not None and agent_guid:
+                agent_name = self.agent_mapping.get(agent_guid, 'Unknown')
+                self.player_stats[player_id]['agent'] = agent_name
+                self.player_stats[player_id]['agent_type'] = self.get_agent_type(agent_name)
+
+
+class KillCollector:
+    # Kills, deaths and assists from playerDied events
+    def __init__(self, player_stats):
+        self.player_stats = player_stats
+
+    def handlers(self):
+        return {"playerDied": self.on_player_died}
+
+    def on_player_died(self, player_died, event):
+        deceased = player_died.get('deceasedId', {}).get('value', None)
+        killer = player_died.get('killerId', {}).get('value', None)
+
+        if killer is not None:
+            self.player_stats[killer]['kills'] += 1
+        if deceased is not None:
+            self.player_stats[deceased]['deaths'] += 1
+
+        for assistant in player_died.get('assistants', []):
+            assistant_id = assistant.get('assistantId', {}).get('value', None)
+            if assistant_id is not None:
+                self.player_stats[assistant_id]['assists'] += 1
+
+
+class DamageCollector:
+    def __init__(self, player_stats):
+        self.player_stats = player_stats
+
+    def handlers(self):
+        return {"damageEvent": self.on_damage}
+
+    def on_damage(self, damage_event, event):
+        causer = damage_event.get('causerId', {}).get('value', None)
+        if causer is not None:
+            self.player_stats[causer]['damage'] += damage_event.get('damageAmount', 0)
+
+
+class AbilityCollector:
+    def __init__(self, player_stats):
+        self.player_stats = player_stats
+
+    def handlers(self):
+        return {"abilityUsed": self.on_ability_used}
+
+    def on_ability_used(self, ability_used, event):
+        player = ability_used.get('playerId', {}).get('value', None)
+        if player is not None:
+            self.player_stats[player]['ability_uses'] += 1
+
+
+class FirstBloodCollector:
+    # First kill of each round, counted only once a round has started
+    def __init__(self, player_stats):
+        self.player_stats = player_stats
+        self.round_active = False
+        self.first_kill_recorded = False
+        self.current_round = 0
+
+    def handlers(self):
+        return {"roundStarted": self.on_round_started, "playerDied": self.on_player_died}
+
+    def on_round_started(self, round_started, event):
+        self.round_active = True
+        self.first_kill_recorded = False
+        self.current_round = round_started.get('roundNumber', self.current_round)
+
+    def on_player_died(self, player_died, event):
+        if not self.round_active or self.first_kill_recorded:
+            return
+        killer = player_died.get('killerId', {}).get('value', None)
+        victim = player_died.get('deceasedId', {}).get('value', None)
+
+        if killer is not None:
+            self.player_stats[killer]['first_bloods'] += 1
+        if victim is not None:
+            self.player_stats[victim]['first_deaths'] += 1
+
+        self.first_kill_recorded = True
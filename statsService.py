@@ -0,0 +1,176 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import argparse
+from collections import OrderedDict
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from statsStore import STATS_DB, INDEXED_COLUMNS, LEADERBOARD_GROUPS, leaderboard, game_breakdown
+
+# Read-only HTTP service over the SQLite analytics store (statsStore.py), for
+# dashboards and agents that would otherwise shell out to matchDetails*.py:
+#
+#   GET /leaderboard/{player|team|agent|agent_type|map}?league=&year=&metric=&top=&min_rounds=
+#       [&player_id=&team_id=&agent=&agent_type=&map=&tournament=]
+#   GET /games/{platform_game_id}
+#   GET /health
+#
+# The database file is read into the page cache at startup and every thread
+# keeps its own read-only, memory-mapped connection. Encoded responses sit
+# in an LRU cache; a `statsStore.py ingest` into the same file bumps SQLite's
+# data_version and the cache is dropped before the next request is served.
+# A result is only cached if no ingest committed while it was computed.
+
+CACHE_ENTRIES = 1024
+MMAP_BYTES = 1024 ** 3
+
+
+class ResultCache:
+    def __init__(self, db_path, max_entries=CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        # data_version changes whenever another connection commits to the file
+        self.watch_connection = open_read_only(db_path)
+        self.data_version = self.current_version()
+
+    def current_version(self):
+        return self.watch_connection.execute("PRAGMA data_version").fetchone()[0]
+
+    def get(self, key):
+        # (cached body or None, data_version it is valid for); pass the version back to put()
+        with self.lock:
+            version = self.current_version()
+            if version != self.data_version:
+                self.entries.clear()
+                self.data_version = version
+            body = self.entries.get(key)
+            if body is None:
+                self.misses += 1
+                return None, version
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return body, version
+
+    def put(self, key, body, version):
+        # A body computed before an ingest committed would outlive the invalidation; drop it
+        with self.lock:
+            if version != self.data_version or version != self.current_version():
+                return
+            self.entries[key] = body
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+
+def open_read_only(db_path):
+    connection = sqlite3.connect(f"file:{os.path.abspath(db_path)}?mode=ro", uri=True, check_same_thread=False)
+    connection.row_factory = sqlite3.Row
+    connection.execute(f"PRAGMA mmap_size={MMAP_BYTES}")
+    return connection
+
+
+def warm_load(db_path):
+    # Pull the whole database (tables and indexes) into the OS page cache
+    size = 0
+    with open(db_path, "rb") as db_file:
+        while chunk := db_file.read(1024 * 1024):
+            size += len(chunk)
+    return size
+
+
+class StatsRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; Nagle would hold the body for the client's delayed ACK
+    disable_nagle_algorithm = True
+    db_path = STATS_DB
+    cache = None
+    local = threading.local()
+
+    def log_message(self, format, *args):
+        pass
+
+    def database(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = self.local.connection = open_read_only(self.db_path)
+        return connection
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parts = [part for part in url.path.split("/") if part]
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        if parts == ['health']:
+            self.respond(200, json.dumps({'status': 'ok', 'cached': len(self.cache.entries),
+                                          'hits': self.cache.hits, 'misses': self.cache.misses}).encode())
+            return
+
+        key = (url.path, tuple(sorted(query.items())))
+        body, version = self.cache.get(key)
+        if body is None:
+            try:
+                result = self.query(parts, query)
+            except (KeyError, ValueError) as error:
+                self.respond(400, json.dumps({'error': str(error)}).encode())
+                return
+            except sqlite3.Error as error:
+                self.respond(500, json.dumps({'error': f"Database error: {error}"}).encode())
+                return
+            if result is None:
+                self.respond(404, json.dumps({'error': f"Not found: {url.path}"}).encode())
+                return
+            body = json.dumps(result).encode()
+            self.cache.put(key, body, version)
+        self.respond(200, body)
+
+    def query(self, parts, query):
+        if len(parts) == 2 and parts[0] == 'leaderboard' and parts[1] in LEADERBOARD_GROUPS:
+            filters = {column: query[column] for column in INDEXED_COLUMNS if column in query}
+            return leaderboard(self.database(), query['league'], int(query['year']), query.get('metric', 'kills'),
+                               parts[1], int(query.get('top', 20)), int(query.get('min_rounds', 0)), **filters)
+        if len(parts) == 2 and parts[0] == 'games':
+            rows = game_breakdown(self.database(), parts[1])
+            return rows or None
+        return None
+
+    def respond(self, status, body):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def make_server(db_path=STATS_DB, host="127.0.0.1", port=8780, cache_entries=CACHE_ENTRIES):
+    if not os.path.isfile(db_path):
+        raise FileNotFoundError(f"{db_path} not found; run statsStore.py ingest first")
+    handler = type("BoundStatsRequestHandler", (StatsRequestHandler,),
+                   {'db_path': db_path, 'cache': ResultCache(db_path, cache_entries), 'local': threading.local()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve leaderboards and game breakdowns from the SQLite stats store.")
+    parser.add_argument('--db', default=STATS_DB, help=f"Database file (default: {STATS_DB}).")
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=8780)
+    parser.add_argument('--cache-entries', type=int, default=CACHE_ENTRIES, help="Cached responses kept (default: 1024).")
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    size = warm_load(args.db)
+    server = make_server(args.db, args.host, args.port, args.cache_entries)
+    print(f"Loaded {size / 1e6:.1f} MB in {time.perf_counter() - start_time:.2f}s; "
+          f"serving {args.db} on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,192 @@
+import sqlite3
+import time
+import argparse
+import playerAggregates
+from playerAggregates import iter_game_partials, KEY_FIELDS, COUNTER_FIELDS
+
+# Local SQLite analytics store: reference data (leagues, tournaments, teams,
+# players, games from mapping_data) plus one row per game, player and agent
+# with every per-game counter from playerAggregates. Filters used by the
+# leaderboards (player, team, agent, agent_type, map, tournament, league-year)
+# are indexed, so questions like "top Duelists by first bloods in 2024
+# vct-international" are a single indexed GROUP BY.
+#
+# Ingest is bulk and transactional: one executemany per table inside one
+# transaction per league-year. Re-ingesting a league-year replaces its rows.
+
+STATS_DB = "stats.sqlite"
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS leagues (league_id TEXT PRIMARY KEY, name TEXT, slug TEXT, region TEXT)",
+    "CREATE TABLE IF NOT EXISTS tournaments (id TEXT PRIMARY KEY, name TEXT, league_id TEXT, status TEXT)",
+    "CREATE TABLE IF NOT EXISTS teams (id TEXT PRIMARY KEY, name TEXT, acronym TEXT, slug TEXT, home_league_id TEXT)",
+    "CREATE TABLE IF NOT EXISTS players (id TEXT PRIMARY KEY, handle TEXT, first_name TEXT, last_name TEXT, "
+    "status TEXT, home_team_id TEXT)",
+    "CREATE TABLE IF NOT EXISTS games (platform_game_id TEXT PRIMARY KEY, esports_game_id TEXT, tournament_id TEXT, "
+    "league TEXT, year INTEGER, map TEXT, team1_id TEXT, team2_id TEXT)",
+    "CREATE TABLE IF NOT EXISTS player_game_stats (platform_game_id TEXT NOT NULL, player_id TEXT NOT NULL, "
+    "team_id TEXT, agent TEXT, agent_type TEXT, map TEXT, tournament TEXT, league TEXT NOT NULL, year INTEGER NOT NULL, "
+    + ", ".join(f"{field} INTEGER NOT NULL DEFAULT 0" for field in COUNTER_FIELDS)
+    + ", PRIMARY KEY (platform_game_id, player_id, agent))",
+    "CREATE TABLE IF NOT EXISTS ingests (league TEXT, year INTEGER, games INTEGER, rows INTEGER, "
+    "ingested_at REAL, PRIMARY KEY (league, year))",
+]
+INDEXED_COLUMNS = ('player_id', 'team_id', 'agent', 'agent_type', 'map', 'tournament')
+SCHEMA += [f"CREATE INDEX IF NOT EXISTS player_game_stats_{column} ON player_game_stats (league, year, {column})"
+           for column in INDEXED_COLUMNS]
+SCHEMA += ["CREATE INDEX IF NOT EXISTS games_league_year ON games (league, year)"]
+
+# Leaderboard metrics: any counter (summed), or a derived rate over the group
+DERIVED_METRICS = {
+    'acs': "ROUND(1.0 * SUM(combat_score) / MAX(SUM(rounds), 1), 1)",
+    'adr': "ROUND(1.0 * SUM(damage) / MAX(SUM(rounds), 1), 1)",
+    'kd': "ROUND(1.0 * SUM(kills) / MAX(SUM(deaths), 1), 2)",
+    'kast_pct': "ROUND(100.0 * SUM(kast_rounds) / MAX(SUM(rounds), 1), 1)",
+    'first_blood_pct': "ROUND(100.0 * SUM(first_bloods) / MAX(SUM(rounds), 1), 1)",
+    'clutch_pct': "ROUND(100.0 * SUM(clutch_wins) / MAX(SUM(clutch_attempts), 1), 1)",
+}
+LEADERBOARD_GROUPS = {
+    'player': ("s.player_id", "COALESCE(p.handle, s.player_id)"),
+    'team': ("s.team_id", "COALESCE(t.name, s.team_id)"),
+    'agent': ("s.agent", "s.agent"),
+    'agent_type': ("s.agent_type", "s.agent_type"),
+    'map': ("s.map", "s.map"),
+}
+
+
+def connect(path=STATS_DB):
+    connection = sqlite3.connect(path, timeout=60, check_same_thread=False)
+    connection.row_factory = sqlite3.Row
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    with connection:
+        for statement in SCHEMA:
+            connection.execute(statement)
+    return connection
+
+
+def reference_rows(catalog):
+    leagues = [(record.get('league_id'), record.get('name'), record.get('slug'), record.get('region'))
+               for record in catalog.leagues]
+    tournaments = [(record.get('id'), record.get('name'), record.get('league_id'), record.get('status'))
+                   for record in catalog.tournaments]
+    teams = [(record.get('id'), record.get('name'), record.get('acronym'), record.get('slug'), record.get('home_league_id'))
+             for record in catalog.teams]
+    # players.json repeats ids; the first record wins, as everywhere else
+    players = [(player_id, records[0].get('handle'), records[0].get('first_name'), records[0].get('last_name'),
+                records[0].get('status'), records[0].get('home_team_id'))
+               for player_id, records in catalog.player_records_by_id.items()]
+    return leagues, tournaments, teams, players
+
+
+def ingest(connection, year, event, workers=1):
+    # Bulk-load one league-year; returns (games, player rows)
+    year = int(year)
+    game_rows, stat_rows = [], []
+    key_index = {field: index for index, field in enumerate(KEY_FIELDS)}
+    counters_at = len(KEY_FIELDS)
+
+    for game_file, partial_rows in iter_game_partials(year, event, workers):
+        platform_game_id = f"val:{game_file.split('_')[1].replace('.json', '')}"
+        # Loaded by iter_game_partials' init_worker
+        catalog = playerAggregates.catalog
+        game = catalog.game(platform_game_id) or {}
+        team_ids = list(game.get('teamMapping', {}).values())
+        game_map = partial_rows[0][key_index['map']] if partial_rows else 'Unknown'
+        game_rows.append((platform_game_id, game.get('esportsGameId'), game.get('tournamentId'), event, year, game_map,
+                          team_ids[0] if team_ids else None, team_ids[1] if len(team_ids) > 1 else None))
+        for row in partial_rows:
+            # The team played for in this game; the home team only when the game has no team data
+            team_id = row[key_index['team']]
+            if team_id is None:
+                team_id = (catalog.player(row[key_index['player']]) or {}).get('home_team_id')
+            stat_rows.append((platform_game_id, row[key_index['player']], team_id,
+                              row[key_index['agent']], row[key_index['agent_type']], row[key_index['map']],
+                              row[key_index['tournament']], event, year, *row[counters_at:]))
+
+    leagues, tournaments, teams, players = reference_rows(playerAggregates.catalog)
+    stat_columns = ("platform_game_id, player_id, team_id, agent, agent_type, map, tournament, league, year, "
+                    + ", ".join(COUNTER_FIELDS))
+    with connection:
+        connection.executemany("INSERT OR REPLACE INTO leagues VALUES (?, ?, ?, ?)", leagues)
+        connection.executemany("INSERT OR REPLACE INTO tournaments VALUES (?, ?, ?, ?)", tournaments)
+        connection.executemany("INSERT OR REPLACE INTO teams VALUES (?, ?, ?, ?, ?)", teams)
+        connection.executemany("INSERT OR REPLACE INTO players VALUES (?, ?, ?, ?, ?, ?)", players)
+        connection.execute("DELETE FROM games WHERE league = ? AND year = ?", (event, year))
+        connection.execute("DELETE FROM player_game_stats WHERE league = ? AND year = ?", (event, year))
+        connection.executemany("INSERT OR REPLACE INTO games VALUES (?, ?, ?, ?, ?, ?, ?, ?)", game_rows)
+        connection.executemany(f"INSERT OR REPLACE INTO player_game_stats ({stat_columns}) "
+                               f"VALUES ({', '.join('?' * (9 + len(COUNTER_FIELDS)))})", stat_rows)
+        connection.execute("INSERT OR REPLACE INTO ingests VALUES (?, ?, ?, ?, ?)",
+                           (event, year, len(game_rows), len(stat_rows), time.time()))
+    connection.execute("ANALYZE")
+    return len(game_rows), len(stat_rows)
+
+
+def leaderboard(connection, league, year, metric='kills', by='player', top=20, min_rounds=0, **filters):
+    # filters: any of player_id, team_id, agent, agent_type, map, tournament (exact match)
+    if metric in DERIVED_METRICS:
+        value = DERIVED_METRICS[metric]
+    elif metric in COUNTER_FIELDS:
+        value = f"SUM({metric})"
+    else:
+        raise ValueError(f"Unknown metric {metric}")
+    if by not in LEADERBOARD_GROUPS:
+        raise ValueError(f"Cannot group by {by}")
+    unknown = set(filters) - set(INDEXED_COLUMNS)
+    if unknown:
+        raise ValueError(f"Cannot filter on {', '.join(sorted(unknown))}")
+
+    group_key, label = LEADERBOARD_GROUPS[by]
+    conditions = ["s.league = ?", "s.year = ?"] + [f"s.{column} = ?" for column in filters]
+    query = (f"SELECT {group_key} AS key, {label} AS name, {value} AS value, SUM(rounds) AS rounds, "
+             f"SUM(games) AS games FROM player_game_stats s "
+             f"LEFT JOIN players p ON p.id = s.player_id LEFT JOIN teams t ON t.id = s.team_id "
+             f"WHERE {' AND '.join(conditions)} GROUP BY {group_key} HAVING SUM(rounds) >= ? "
+             f"ORDER BY value DESC, key LIMIT ?")
+    parameters = [league, int(year), *filters.values(), min_rounds, top]
+    return [dict(row) for row in connection.execute(query, parameters)]
+
+
+def game_breakdown(connection, platform_game_id):
+    # Every player row of one game with handle and team name
+    query = ("SELECT s.*, p.handle, t.name AS team_name FROM player_game_stats s "
+             "LEFT JOIN players p ON p.id = s.player_id LEFT JOIN teams t ON t.id = s.team_id "
+             "WHERE s.platform_game_id = ? ORDER BY s.team_id, s.kills DESC")
+    return [dict(row) for row in connection.execute(query, (platform_game_id,))]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load processed stats into SQLite and query leaderboards.")
+    parser.add_argument('--db', default=STATS_DB, help=f"Database file (default: {STATS_DB}).")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    ingest_parser = subparsers.add_parser('ingest', help="Bulk-load a league-year (replacing any earlier load).")
+    ingest_parser.add_argument('year')
+    ingest_parser.add_argument('event')
+    ingest_parser.add_argument('--workers', type=int, default=1)
+
+    top_parser = subparsers.add_parser('top', help="Leaderboard for a league-year.")
+    top_parser.add_argument('year')
+    top_parser.add_argument('event')
+    top_parser.add_argument('--metric', default='kills', help="A counter (e.g. first_bloods) or one of: " + ", ".join(DERIVED_METRICS))
+    top_parser.add_argument('--by', default='player', choices=list(LEADERBOARD_GROUPS))
+    top_parser.add_argument('--top', type=int, default=20)
+    top_parser.add_argument('--min-rounds', type=int, default=0)
+    for column in INDEXED_COLUMNS:
+        top_parser.add_argument(f"--{column.replace('_', '-')}", dest=column)
+    args = parser.parse_args()
+
+    connection = connect(args.db)
+    if args.command == 'ingest':
+        start_time = time.perf_counter()
+        games, rows = ingest(connection, args.year, args.event, args.workers)
+        print(f"Ingested {games} games, {rows} player rows into {args.db} in {time.perf_counter() - start_time:.2f}s")
+    else:
+        filters = {column: getattr(args, column) for column in INDEXED_COLUMNS if getattr(args, column) is not None}
+        start_time = time.perf_counter()
+        rows = leaderboard(connection, args.event, args.year, args.metric, args.by, args.top, args.min_rounds, **filters)
+        elapsed_ms = (time.perf_counter() - start_time) * 1000
+        for row in rows:
+            print(f"{row['name']}: {args.metric}={row['value']} (games={row['games']}, rounds={row['rounds']})")
+        print(f"{len(rows)} rows in {elapsed_ms:.1f} ms")
@@ -0,0 +1,225 @@
+import gzip
+import json
+import os
+import random
+import shutil
+import argparse
+from datetime import datetime, timedelta, timezone
+
+# Generates a league's worth of synthetic but schema-faithful data, laid out
+# exactly like dataExtractor leaves it on disk:
+#
+#   {root}/{league}/esports-data/{leagues,tournaments,players,teams,mapping_data}.json + agent.txt
+#   {root}/{league}/games/{year}/{platformGameId with ':' -> '_'}.json
+#
+# Game files hold configuration, roundStarted, damageEvent, abilityUsed,
+# playerDied (with assistants), snapshot and roundEnded events with the same nesting
+# and metadata (sequenceNumber, wallTime, gameTime) as the real feed, so
+# every stage of the pipeline can be run and benchmarked without S3.
+# With a fixed seed the output is byte-for-byte reproducible.
+
+AGENTS = {
+    "add6443a-41bd-e414-f6ad-e58d267f4e95": "Jett",
+    "a3bfb853-43b2-7238-a4f1-ad90e9e46bcc": "Reyna",
+    "8e253930-4c05-31dd-1b6c-968525494517": "Omen",
+    "320b2a48-4d9b-a075-30f1-1f93a9b638fa": "Sova",
+    "1e58de9c-4950-5125-93e9-a0aee9f98746": "Killjoy",
+    "707eab51-4836-f488-046a-cda6bf494859": "Viper",
+    "569fdd95-4d10-43ab-ca70-79becc718b46": "Sage",
+    "5f8d3a7f-467b-97f3-062c-13acf203c006": "Breach",
+    "6f2a04ca-43e0-be17-7f36-b3908627744d": "Skye",
+    "1dbf2edd-4729-0984-3115-daa5eed44993": "Clove",
+}
+MAPS = ["Ascent", "Bind", "Haven", "Split", "Lotus", "Sunset", "Icebox"]
+WEAPON_GUID = "9c82e19d-4575-0200-1a81-3eacf00cf872"
+ABILITY_SLOTS = ["GRENADE", "ABILITY_1", "ABILITY_2", "ULTIMATE"]
+DAMAGE_LOCATIONS = ["HEAD", "BODY", "LEG"]
+
+PLAYERS_PER_TEAM = 5
+TOURNAMENTS = 3
+
+
+def write_json(path, data):
+    with open(path, "w") as json_file:
+        json.dump(data, json_file)
+
+
+class GameWriter:
+    # Builds one game's event list, stamping metadata as the real feed does
+    def __init__(self, platform_game_id, start_time):
+        self.platform_game_id = platform_game_id
+        self.events = []
+        self.start_time = start_time
+        self.game_time = 0.0
+
+    def add(self, event_type, payload):
+        self.events.append({
+            "platformGameId": self.platform_game_id,
+            "metadata": {
+                "sequenceNumber": len(self.events) + 1,
+                "wallTime": (self.start_time + timedelta(seconds=self.game_time)).strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
+                "gameTime": {"includedPauses": f"{self.game_time:.3f}s"},
+            },
+            event_type: payload,
+        })
+
+
+def generate_game(rng, platform_game_id, team_ids, rounds, events_per_round, start_time):
+    # team_ids are the two in-game team ids; in-game player ids are 1..10
+    writer = GameWriter(platform_game_id, start_time)
+    agent_guids = list(AGENTS)
+    roster = {team_id: [slot + 1 + index * PLAYERS_PER_TEAM for slot in range(PLAYERS_PER_TEAM)]
+              for index, team_id in enumerate(team_ids)}
+    all_players = [player_id for members in roster.values() for player_id in members]
+
+    selected_map = rng.choice(MAPS)
+    writer.add("configuration", {
+        "players": [{"playerId": {"value": player_id},
+                     "selectedAgent": {"fallback": {"guid": rng.choice(agent_guids).upper()}}}
+                    for player_id in all_players],
+        "teams": [{"teamId": {"value": team_id}, "playersInTeam": [{"value": player_id} for player_id in members]}
+                  for team_id, members in roster.items()],
+        "selectedMap": {"fallback": {"guid": f"/Game/Maps/{selected_map}/{selected_map}",
+                                     "displayName": selected_map}},
+    })
+
+    for round_number in range(rounds):
+        writer.add("roundStarted", {"roundNumber": round_number, "spikeMode": {"attackingTeam": {"value": team_ids[round_number % 2]}}})
+        alive = {team_id: list(members) for team_id, members in roster.items()}
+        for _ in range(rng.randint(events_per_round // 2, events_per_round * 3 // 2)):
+            writer.game_time += rng.random()
+            roll = rng.random()
+            if roll < 0.06:
+                writer.add("damageEvent", {"causerId": {"value": rng.choice(all_players)},
+                                           "victimId": {"value": rng.choice(all_players)},
+                                           "location": rng.choice(DAMAGE_LOCATIONS),
+                                           "damageAmount": rng.randint(1, 150), "killEvent": False})
+            elif roll < 0.14:
+                writer.add("abilityUsed", {"playerId": {"value": rng.choice(all_players)},
+                                           "ability": {"fallback": {"inventorySlot": {"slot": rng.choice(ABILITY_SLOTS)}}},
+                                           "chargesConsumed": 1})
+            elif roll >= 0.2:
+                # Position snapshots dominate the real feed; the stats stages skip them
+                writer.add("snapshot", {"players": [
+                    {"playerId": {"value": player_id},
+                     "aliveState": {"position": {"x": round(rng.uniform(-8000, 8000), 1),
+                                                 "y": round(rng.uniform(-8000, 8000), 1)}}}
+                    for members in alive.values() for player_id in members]})
+            elif all(alive.values()):
+                victim_team = rng.choice(team_ids)
+                killer_team = team_ids[1] if victim_team == team_ids[0] else team_ids[0]
+                victim = rng.choice(alive[victim_team])
+                alive[victim_team].remove(victim)
+                killer = rng.choice(alive[killer_team])
+                assistants = [{"assistantId": {"value": player_id}, "assistGameTime": {"includedPauses": f"{writer.game_time:.3f}s"}}
+                              for player_id in alive[killer_team] if player_id != killer and rng.random() < 0.3]
+                if rng.random() < 0.8:
+                    source = {"weapon": {"fallback": {"guid": WEAPON_GUID, "inventorySlot": {"slot": "PRIMARY"}}}}
+                else:
+                    source = {"ability": {"fallback": {"guid": rng.choice(agent_guids), "inventorySlot": {"slot": rng.choice(ABILITY_SLOTS)}}}}
+                writer.add("playerDied", {"deceasedId": {"value": victim}, "killerId": {"value": killer},
+                                          **source, "assistants": assistants})
+        standing = sorted(team_ids, key=lambda team_id: len(alive[team_id]), reverse=True)
+        writer.add("roundEnded", {"roundNumber": round_number, "winningTeam": {"value": standing[0]}})
+
+    return writer.events
+
+
+def generate_league(root, league="vct-international", year=2024, games=10, teams=8, rounds=(13, 24),
+                    events_per_round=300, seed=1):
+    # Returns {'games': [paths], 'events': total event count}
+    rng = random.Random(seed)
+    esports_dir = f"{root}/{league}/esports-data"
+    games_dir = f"{root}/{league}/games/{year}"
+    os.makedirs(esports_dir, exist_ok=True)
+    os.makedirs(games_dir, exist_ok=True)
+
+    league_id = str(100000 + seed)
+    team_records = [{"id": str(200000 + team), "acronym": f"T{team}", "home_league_id": league_id,
+                     "slug": f"team-{team}", "name": f"Team {team}"} for team in range(teams)]
+    player_records = [{"id": str(300000 + team * PLAYERS_PER_TEAM + slot), "handle": f"player{team}_{slot}",
+                       "first_name": "First", "last_name": "Last", "status": "active",
+                       "photo_url": "", "home_team_id": team_records[team]["id"], "created_at": "2024-01-01T00:00:00Z",
+                       "updated_at": "2024-01-01T00:00:00Z"}
+                      for team in range(teams) for slot in range(PLAYERS_PER_TEAM)]
+    tournament_records = [{"id": str(400000 + tournament), "status": "published", "league_id": league_id,
+                           "time_zone": "UTC", "name": f"{league}_{year}_stage_{tournament + 1}"}
+                          for tournament in range(TOURNAMENTS)]
+
+    mapping_data = []
+    game_paths = []
+    events = 0
+    start_time = datetime(year, 1, 1, tzinfo=timezone.utc)
+    for game in range(games):
+        platform_game_id = f"val:{rng.getrandbits(128):032x}"
+        platform_game_id = (f"{platform_game_id[:12]}-{platform_game_id[12:16]}-{platform_game_id[16:20]}-"
+                            f"{platform_game_id[20:24]}-{platform_game_id[24:]}")
+        home, away = rng.sample(range(teams), 2)
+        in_game_teams = (11, 12)
+        participant_mapping = {}
+        for index, team in enumerate((home, away)):
+            for slot in range(PLAYERS_PER_TEAM):
+                participant_mapping[str(slot + 1 + index * PLAYERS_PER_TEAM)] = player_records[team * PLAYERS_PER_TEAM + slot]["id"]
+        mapping_data.append({
+            "platformGameId": platform_game_id,
+            "esportsGameId": str(500000 + game),
+            "tournamentId": tournament_records[game % TOURNAMENTS]["id"],
+            "teamMapping": {str(in_game_teams[0]): team_records[home]["id"], str(in_game_teams[1]): team_records[away]["id"]},
+            "participantMapping": participant_mapping,
+        })
+
+        game_events = generate_game(rng, platform_game_id, in_game_teams, rng.randint(*rounds), events_per_round,
+                                    start_time + timedelta(hours=game))
+        game_path = os.path.join(games_dir, f"{platform_game_id.replace(':', '_')}.json")
+        write_json(game_path, game_events)
+        game_paths.append(game_path)
+        events += len(game_events)
+
+    write_json(f"{esports_dir}/leagues.json", [{"league_id": league_id, "region": "INTL", "dark_logo_url": "",
+                                                 "light_logo_url": "", "name": league, "slug": league}])
+    write_json(f"{esports_dir}/tournaments.json", tournament_records)
+    write_json(f"{esports_dir}/players.json", player_records)
+    write_json(f"{esports_dir}/teams.json", team_records)
+    write_json(f"{esports_dir}/mapping_data.json", mapping_data)
+    write_json(f"{esports_dir}/agent.txt", AGENTS)
+    return {'games': game_paths, 'events': events}
+
+
+def publish_as_bucket(root, league, year, bucket_dir):
+    # Mirror the S3 layout dataExtractor downloads from: gzipped files under their original names
+    for name in ("leagues", "tournaments", "players", "teams", "mapping_data"):
+        gzip_file(f"{root}/{league}/esports-data/{name}.json", f"{bucket_dir}/{league}/esports-data/{name}.json.gz")
+    with open(f"{root}/{league}/esports-data/mapping_data.json", "r") as mapping_file:
+        mapping_data = json.load(mapping_file)
+    for game in mapping_data:
+        platform_game_id = game['platformGameId']
+        gzip_file(f"{root}/{league}/games/{year}/{platform_game_id.replace(':', '_')}.json",
+                  f"{bucket_dir}/{league}/games/{year}/{platform_game_id}.json.gz")
+
+
+def gzip_file(source_path, target_path):
+    os.makedirs(os.path.dirname(target_path), exist_ok=True)
+    with open(source_path, "rb") as source_file, gzip.open(target_path, "wb", compresslevel=6) as target_file:
+        shutil.copyfileobj(source_file, target_file)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic league of schema-faithful game files.")
+    parser.add_argument('root', help="Directory to write the league into")
+    parser.add_argument('--league', default="vct-international")
+    parser.add_argument('--year', type=int, default=2024)
+    parser.add_argument('--games', type=int, default=10)
+    parser.add_argument('--teams', type=int, default=8)
+    parser.add_argument('--min-rounds', type=int, default=13)
+    parser.add_argument('--max-rounds', type=int, default=24)
+    parser.add_argument('--events-per-round', type=int, default=300, help="Average events per round (default: 300).")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--bucket', help="Also write a gzipped copy laid out like the S3 bucket into this directory.")
+    args = parser.parse_args()
+
+    generated = generate_league(args.root, args.league, args.year, args.games, args.teams,
+                                (args.min_rounds, args.max_rounds), args.events_per_round, args.seed)
+    print(f"Generated {len(generated['games'])} games with {generated['events']} events in {args.root}/{args.league}")
+    if args.bucket:
+        publish_as_bucket(args.root, args.league, args.year, args.bucket)
+        print(f"Published gzipped copy to {args.bucket}")
@@ -0,0 +1,22 @@
+import os
+import sys
+import pytest
+
+# The pipeline modules live flat in the repository root and read and write
+# paths relative to the working directory, so tests run inside a temporary
+# league root.
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from syntheticGames import generate_league
+
+LEAGUE = "vct-international"
+YEAR = 2024
+
+
+@pytest.fixture
+def league_root(tmp_path, monkeypatch):
+    # A small synthetic league in tmp_path, which is also the working directory
+    generate_league(str(tmp_path), LEAGUE, YEAR, games=3, teams=4, rounds=(13, 14), events_per_round=40, seed=1)
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
@@ -0,0 +1,62 @@
+import os
+import dataExtractor
+from conftest import LEAGUE, YEAR
+from dataExtractor import load_manifest, save_manifest, is_downloaded, file_sha256, local_name
+
+
+def game_path(league_root):
+    games_dir = f"{LEAGUE}/games/{YEAR}"
+    return f"{games_dir}/{sorted(os.listdir(games_dir))[0]}"
+
+
+def complete_entry(path):
+    return {"size": os.path.getsize(path), "etag": None, "sha256": file_sha256(path), "status": "complete"}
+
+
+def test_manifest_round_trip(league_root):
+    assert load_manifest(LEAGUE) == {}
+    path = game_path(league_root)
+    manifest = {path: complete_entry(path), f"{LEAGUE}/games/{YEAR}/val_missing.json":
+                {"size": None, "etag": "abc", "sha256": None, "status": "failed"}}
+    save_manifest(LEAGUE, manifest)
+    assert load_manifest(LEAGUE) == manifest
+
+
+def test_complete_download_is_trusted_until_it_changes(league_root):
+    path = game_path(league_root)
+    manifest = {path: complete_entry(path)}
+    assert is_downloaded(path, manifest)
+    with open(path, "a") as game_file:
+        game_file.write(" ")
+    assert not is_downloaded(path, manifest)
+
+
+def test_failed_and_missing_downloads_are_fetched_again(league_root):
+    path = game_path(league_root)
+    assert not is_downloaded(path, {path: dict(complete_entry(path), status="failed")})
+    assert not is_downloaded(f"{LEAGUE}/games/{YEAR}/val_missing.json", {})
+
+
+def test_checksums_are_verified_when_enabled(league_root, monkeypatch):
+    path = game_path(league_root)
+    manifest = {path: dict(complete_entry(path), sha256="0" * 64)}
+    assert is_downloaded(path, manifest)
+    monkeypatch.setattr(dataExtractor, "VERIFY_CHECKSUMS", True)
+    assert not is_downloaded(path, manifest)
+
+
+def test_files_from_before_the_manifest_are_adopted_only_when_complete(league_root):
+    path = game_path(league_root)
+    manifest = {}
+    assert is_downloaded(path, manifest)
+    assert manifest[path]["status"] == "complete"
+
+    truncated_path = f"{LEAGUE}/games/{YEAR}/val_truncated.json"
+    with open(path, "rb") as game_file, open(truncated_path, "wb") as truncated_file:
+        truncated_file.write(game_file.read()[:-10])
+    assert not is_downloaded(truncated_path, manifest)
+    assert truncated_path not in manifest
+
+
+def test_local_names_replace_colons():
+    assert local_name(f"{LEAGUE}/games/{YEAR}/val:1234") == f"{LEAGUE}/games/{YEAR}/val_1234.json"
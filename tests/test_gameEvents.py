@@ -0,0 +1,52 @@
+import json
+import pytest
+import jsonBackend
+from gameEvents import iter_game_events, iter_game_event_spans, scan_game_events
+
+EVENTS = [{'a': 1}, {'b': [2, 3]}, {'c': "ü"}]
+
+
+def write_game(tmp_path, text):
+    path = tmp_path / "val_game.json"
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 1024])
+def test_scanner_reads_every_event(tmp_path, chunk_size):
+    path = write_game(tmp_path, json.dumps(EVENTS, indent=2, ensure_ascii=False))
+    assert [event for event, _, _ in scan_game_events(path, "utf-8", chunk_size)] == EVENTS
+
+
+def test_spans_are_byte_ranges(tmp_path):
+    path = write_game(tmp_path, json.dumps(EVENTS, ensure_ascii=False))
+    with open(path, "rb") as game_file:
+        data = game_file.read()
+    # The span decodes to the original event even where the latin-1 event itself does not
+    spans = [(start, end) for _, start, end in iter_game_event_spans(path)]
+    assert [json.loads(data[start:end]) for start, end in spans] == EVENTS
+
+
+@pytest.mark.parametrize('text', ['[]', ' [ ] ', '[{"a": 1}]', '[{"a": 1} ,\n {"b": 2}]'])
+def test_scanner_accepts_well_formed_arrays(tmp_path, text):
+    path = write_game(tmp_path, text)
+    assert [event for event, _, _ in scan_game_events(path, "utf-8", 2)] == json.loads(text)
+
+
+@pytest.mark.parametrize('text', ['[{"a": 1} {"b": 2}]', '[{"a": 1}{"b": 2}]', '[{"a": 1},, {"b": 2}]',
+                                  '[{"a": 1},]', '[, {"a": 1}]', '[{"a": 1}', '{"a": 1}', ''])
+def test_scanner_rejects_malformed_arrays(tmp_path, text):
+    path = write_game(tmp_path, text)
+    with pytest.raises(ValueError):
+        list(scan_game_events(path, "utf-8", 2))
+
+
+@pytest.mark.parametrize('backend', jsonBackend.available_backends())
+def test_every_backend_yields_the_same_events(tmp_path, monkeypatch, backend):
+    monkeypatch.setattr(jsonBackend, "BACKEND", jsonBackend.BACKEND)
+    monkeypatch.setattr(jsonBackend, "backend_loads", jsonBackend.backend_loads)
+    jsonBackend.use_backend(backend)
+    path = write_game(tmp_path, json.dumps(EVENTS))
+    assert list(iter_game_events(path)) == EVENTS
+    with pytest.raises(ValueError):
+        list(iter_game_events(write_game(tmp_path, '[{"a": 1},, {"b": 2}]')))
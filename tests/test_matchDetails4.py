@@ -0,0 +1,59 @@
+import os
+import pytest
+import matchDetails4
+from conftest import LEAGUE, YEAR
+
+
+@pytest.fixture
+def processed_game(league_root, monkeypatch):
+    # One game processed the way matchDetails4's main loop records it; returns (game file, state)
+    # init_worker sets module globals; monkeypatch restores them after the test
+    for name in ('catalog', 'games_dir', 'columnar_games_dir', 'vectorized', 'consolidated', 'league_year',
+                 'partition_game_ids'):
+        monkeypatch.setattr(matchDetails4, name, getattr(matchDetails4, name))
+    # Catalogs are cached per league name, and every test has its own league directory
+    monkeypatch.setattr(matchDetails4, "catalogs", {})
+    matchDetails4.init_worker(str(YEAR), LEAGUE)
+    game_file = sorted(os.listdir(matchDetails4.games_dir))[0]
+    fingerprint = matchDetails4.game_fingerprint(game_file)
+    output = matchDetails4.process_game(game_file)
+    state = {os.path.join(matchDetails4.games_dir, game_file): {'fingerprint': fingerprint, 'output': output}}
+    return game_file, state
+
+
+def test_state_round_trip(processed_game):
+    game_file, state = processed_game
+    assert matchDetails4.load_processing_state() == {}
+    matchDetails4.save_processing_state(state)
+    loaded = matchDetails4.load_processing_state()
+    assert loaded == state
+    assert matchDetails4.is_up_to_date(game_file, loaded)
+
+
+def test_changed_game_file_is_not_up_to_date(processed_game):
+    game_file, state = processed_game
+    game_path = os.path.join(matchDetails4.games_dir, game_file)
+    stat = os.stat(game_path)
+    os.utime(game_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert not matchDetails4.is_up_to_date(game_file, state)
+
+
+def test_missing_output_is_not_up_to_date(processed_game):
+    game_file, state = processed_game
+    os.remove(state[os.path.join(matchDetails4.games_dir, game_file)]['output'])
+    assert not matchDetails4.is_up_to_date(game_file, state)
+
+
+def test_switching_output_mode_invalidates_state(processed_game, monkeypatch):
+    game_file, state = processed_game
+    monkeypatch.setattr(matchDetails4, "consolidated", True)
+    assert not matchDetails4.is_up_to_date(game_file, state)
+
+
+def test_fingerprint_taken_before_a_change_does_not_match(processed_game):
+    game_file, state = processed_game
+    entry = state[os.path.join(matchDetails4.games_dir, game_file)]
+    with open(os.path.join(matchDetails4.games_dir, game_file), "a") as game_file_handle:
+        game_file_handle.write("\n")
+    assert entry['fingerprint'] != matchDetails4.game_fingerprint(game_file)
+    assert not matchDetails4.is_up_to_date(game_file, state)
@@ -0,0 +1,52 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from conftest import LEAGUE
+from referenceCatalog import ReferenceCatalog, CATALOG_CACHE_FILE
+
+
+def load_fingerprint(_):
+    return ReferenceCatalog.load(LEAGUE).fingerprint
+
+
+def leftover_temp_files(directory):
+    return [name for name in os.listdir(directory) if name.endswith(".part")]
+
+
+def test_concurrent_loads_share_one_cache(league_root):
+    directory = f"{LEAGUE}/esports-data"
+    cache_path = f"{directory}/{CATALOG_CACHE_FILE}"
+    with ProcessPoolExecutor(4) as executor:
+        for _ in range(5):
+            if os.path.exists(cache_path):
+                os.remove(cache_path)
+            # Every worker builds the catalog and writes the cache at about the same time
+            fingerprints = set(executor.map(load_fingerprint, range(8)))
+            assert len(fingerprints) == 1
+            assert os.path.isfile(cache_path)
+            assert leftover_temp_files(directory) == []
+    assert ReferenceCatalog.load(LEAGUE).fingerprint in fingerprints
+
+
+def test_failed_cache_write_is_not_fatal(league_root, capsys):
+    directory = f"{LEAGUE}/esports-data"
+    # A directory in the cache's place makes the final rename fail
+    os.makedirs(f"{directory}/{CATALOG_CACHE_FILE}")
+    catalog = ReferenceCatalog.load(LEAGUE)
+    assert catalog.mapping_data
+    assert "Could not cache the reference catalog" in capsys.readouterr().out
+    assert leftover_temp_files(directory) == []
+
+
+def test_cache_is_rebuilt_when_a_source_changes(league_root):
+    catalog = ReferenceCatalog.load(LEAGUE)
+    teams_path = f"{LEAGUE}/esports-data/teams.json"
+    with open(teams_path, "r") as teams_file:
+        teams = json.load(teams_file)
+    teams.append({'id': "999", 'name': "Added Team"})
+    with open(teams_path, "w") as teams_file:
+        json.dump(teams, teams_file)
+
+    reloaded = ReferenceCatalog.load(LEAGUE)
+    assert reloaded.fingerprint != catalog.fingerprint
+    assert reloaded.team_name("999") == "Added Team"
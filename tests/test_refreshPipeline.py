@@ -0,0 +1,61 @@
+import os
+import shutil
+import threading
+from functools import partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+import pytest
+import dataExtractor
+import matchDetails4
+from conftest import LEAGUE, YEAR
+from refreshPipeline import run_pipeline
+from syntheticGames import generate_league, publish_as_bucket
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def bucket(tmp_path, monkeypatch):
+    # A served bucket of four games, one of which was never uploaded; returns the missing game's local path
+    source_dir = tmp_path / "source"
+    bucket_dir = tmp_path / "bucket"
+    work_dir = tmp_path / "work"
+    generated = generate_league(str(source_dir), LEAGUE, YEAR, games=4, teams=4, rounds=(13, 14),
+                                events_per_round=40, seed=2)
+    publish_as_bucket(str(source_dir), LEAGUE, YEAR, str(bucket_dir))
+    missing_game = os.path.basename(generated['games'][0])
+    remote_name = missing_game.replace("val_", "val:", 1)
+    os.remove(bucket_dir / LEAGUE / "games" / str(YEAR) / f"{remote_name}.gz")
+
+    # agent.txt is not part of the bucket; analysts keep it next to the downloaded reference data
+    os.makedirs(work_dir / LEAGUE / "esports-data")
+    shutil.copy(source_dir / LEAGUE / "esports-data" / "agent.txt", work_dir / LEAGUE / "esports-data")
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(QuietHandler, directory=str(bucket_dir)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(dataExtractor, "S3_BUCKET_URL", f"http://127.0.0.1:{server.server_address[1]}")
+    monkeypatch.setattr(dataExtractor, "BLOB_CACHE_DIR", None)
+    monkeypatch.setattr(matchDetails4, "catalogs", {})
+    monkeypatch.chdir(work_dir)
+    yield f"{LEAGUE}/games/{YEAR}/{missing_game}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_games_that_could_not_be_downloaded_are_failures(bucket):
+    processed, skipped, failures = run_pipeline([LEAGUE], [YEAR], download_workers=2, process_workers=2)
+    assert (processed, skipped) == (3, 0)
+    assert failures == [bucket]
+    assert len([name for name in os.listdir("processedData") if name.startswith("val_")]) == 3
+    # The failed game is not recorded as processed
+    assert bucket not in matchDetails4.load_processing_state()
+
+
+def test_incremental_refresh_skips_processed_games(bucket):
+    run_pipeline([LEAGUE], [YEAR], download_workers=2, process_workers=2)
+    processed, skipped, failures = run_pipeline([LEAGUE], [YEAR], download_workers=2, process_workers=2,
+                                                incremental=True)
+    assert (processed, skipped) == (0, 3)
+    assert failures == [bucket]
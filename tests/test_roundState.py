@@ -0,0 +1,44 @@
+import pytest
+from roundState import RoundStateCollector, TRADE_WINDOW_SECONDS
+from statCollectors import EventDispatcher
+
+TEAMS = {'red': ["r1", "r2"], 'blue': ["b1", "b2"]}
+
+
+def configuration():
+    return {'configuration': {'teams': [{'teamId': {'value': team_id},
+                                         'playersInTeam': [{'value': player_id} for player_id in players]}
+                                        for team_id, players in TEAMS.items()]}}
+
+
+def death(victim, killer, game_time):
+    return {'playerDied': {'deceasedId': {'value': victim}, 'killerId': {'value': killer}},
+            'metadata': {'gameTime': game_time}}
+
+
+def traded_players(deaths):
+    collector = RoundStateCollector()
+    events = [configuration(), {'roundStarted': {'roundNumber': 1}}, *deaths,
+              {'roundEnded': {'winningTeam': {'value': "red"}}}]
+    EventDispatcher([collector]).run(events)
+    return {player_id for player_id, stats in collector.player_summary().items() if stats['traded_deaths']}
+
+
+def test_teammate_killing_the_killer_is_a_trade():
+    assert traded_players([death("r1", "b1", 10.0), death("b1", "r2", 12.0)]) == {"r1"}
+
+
+def test_trade_must_happen_inside_the_window():
+    assert traded_players([death("r1", "b1", 10.0), death("b1", "r2", 10.0 + TRADE_WINDOW_SECONDS + 1)]) == set()
+
+
+@pytest.mark.parametrize('deaths', [
+    # The killer is team-killed
+    [death("r1", "b1", 10.0), death("b1", "b2", 11.0)],
+    # A team kill, then the team killer dies to the other side
+    [death("r1", "r2", 10.0), death("r2", "b1", 11.0)],
+    # The killer dies with nobody credited
+    [death("r1", "b1", 10.0), death("b1", None, 11.0)],
+])
+def test_deaths_not_avenged_by_a_teammate_are_not_traded(deaths):
+    assert traded_players(deaths) == set()
@@ -0,0 +1,286 @@
+import json
+import os
+import argparse
+import numpy as np
+import jsonBackend
+from playerAggregates import season_partial, derived_metrics, PlayerPartial, KEY_FIELDS, COUNTER_FIELDS
+import playerAggregates
+
+# Local, offline vector index for README "DB 1"/"DB 2": match and player
+# stat feature vectors, searchable by cosine similarity.
+#
+# An index directory holds
+#   vectors.npy      float32 [rows, dim], L2-normalised, memory-mapped on open
+#   ids.json         row -> id
+#   metadata.json    row -> dict, used for equality filters (e.g. team)
+#   ivf.npz          optional coarse quantiser: centroids plus rows grouped
+#                    by nearest centroid, for approximate search
+#
+# Exact search scores every row; approximate search only scores the rows
+# in the `nprobe` closest centroid lists, so recall is tuned with nprobe.
+
+PLAYER_FEATURES = ('acs', 'adr', 'kd', 'kast_pct', 'first_blood_pct', 'weapon_kill_pct', 'ability_kill_pct',
+                   'clutch_pct', 'flexibility', 'assists_per_round', 'ability_uses_per_round',
+                   'first_deaths_per_round')
+MATCH_FEATURES = ('rounds', 'kills_per_round', 'damage_per_round', 'first_bloods_per_round',
+                  'clutch_attempts_per_round', 'ability_uses_per_round', 'kast_pct')
+
+
+def normalize_rows(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return (vectors / norms).astype(np.float32)
+
+
+def write_json(path, data):
+    with open(path, "w") as json_file:
+        json.dump(data, json_file)
+
+
+def top_k(scores, k):
+    k = min(k, len(scores))
+    if k == 0:
+        return np.empty(0, dtype=np.int64)
+    best = np.argpartition(-scores, k - 1)[:k]
+    return best[np.argsort(-scores[best], kind='stable')]
+
+
+class VectorIndex:
+    def __init__(self, index_dir):
+        self.index_dir = index_dir
+        self.ids = []
+        self.metadata = []
+        self.vectors = np.empty((0, 0), dtype=np.float32)
+        self.row_of_id = {}
+        self.metadata_columns = {}
+        self.ivf = None
+        if os.path.isfile(os.path.join(index_dir, "ids.json")):
+            self.load()
+
+    def load(self):
+        with open(os.path.join(self.index_dir, "ids.json"), "r") as ids_file:
+            self.ids = jsonBackend.load(ids_file)
+        with open(os.path.join(self.index_dir, "metadata.json"), "r") as metadata_file:
+            self.metadata = jsonBackend.load(metadata_file)
+        self.vectors = np.load(os.path.join(self.index_dir, "vectors.npy"), mmap_mode='r' if self.ids else None)
+        self.row_of_id = {row_id: row for row, row_id in enumerate(self.ids)}
+        self.metadata_columns = {}
+        ivf_path = os.path.join(self.index_dir, "ivf.npz")
+        if os.path.isfile(ivf_path):
+            ivf = np.load(ivf_path)
+            self.ivf = {name: ivf[name] for name in ivf.files}
+
+    def upsert(self, ids, vectors, metadata=None):
+        # Batched insert-or-replace; vectors are normalised on the way in
+        vectors = normalize_rows(np.asarray(vectors, dtype=np.float32))
+        metadata = metadata if metadata is not None else [{} for _ in ids]
+        if len(self.ids) == 0:
+            self.vectors = np.empty((0, vectors.shape[1]), dtype=np.float32)
+        elif vectors.shape[1] != self.vectors.shape[1]:
+            raise ValueError(f"Expected {self.vectors.shape[1]}-dimensional vectors, got {vectors.shape[1]}")
+
+        existing = [(position, self.row_of_id[row_id]) for position, row_id in enumerate(ids) if row_id in self.row_of_id]
+        new = [position for position, row_id in enumerate(ids) if row_id not in self.row_of_id]
+
+        updated = np.array(self.vectors)
+        for position, row in existing:
+            updated[row] = vectors[position]
+            self.metadata[row] = metadata[position]
+        if new:
+            updated = np.concatenate([updated, vectors[new]])
+            for position in new:
+                self.row_of_id[ids[position]] = len(self.ids)
+                self.ids.append(ids[position])
+                self.metadata.append(metadata[position])
+        self.vectors = updated
+        self.metadata_columns = {}
+        # The coarse quantiser no longer covers the new rows
+        self.ivf = None
+
+    def save(self):
+        os.makedirs(self.index_dir, exist_ok=True)
+        files = {"vectors.npy": lambda path: np.save(path, self.vectors),
+                 "ids.json": lambda path: write_json(path, self.ids),
+                 "metadata.json": lambda path: write_json(path, self.metadata)}
+        if self.ivf is not None:
+            files["ivf.npz"] = lambda path: np.savez(path, **self.ivf)
+        elif os.path.isfile(os.path.join(self.index_dir, "ivf.npz")):
+            os.remove(os.path.join(self.index_dir, "ivf.npz"))
+        for name, write in files.items():
+            path = os.path.join(self.index_dir, name)
+            temp_path = f"{path}.part{os.path.splitext(name)[1]}"
+            write(temp_path)
+            os.replace(temp_path, path)
+        self.load()
+
+    def build_ivf(self, lists=None, iterations=10, seed=0):
+        # k-means coarse quantiser; rows are stored grouped by list for cheap gathers
+        rows = len(self.ids)
+        lists = lists or max(1, int(np.sqrt(rows)))
+        lists = min(lists, rows)
+        vectors = np.asarray(self.vectors)
+        rng = np.random.default_rng(seed)
+        centroids = vectors[rng.choice(rows, lists, replace=False)].copy()
+        for _ in range(iterations):
+            assignments = np.argmax(vectors @ centroids.T, axis=1)
+            for list_number in range(lists):
+                members = vectors[assignments == list_number]
+                if len(members):
+                    centroids[list_number] = members.mean(axis=0)
+            centroids = normalize_rows(centroids)
+        assignments = np.argmax(vectors @ centroids.T, axis=1)
+        order = np.argsort(assignments, kind='stable').astype(np.int64)
+        offsets = np.searchsorted(assignments[order], np.arange(lists + 1)).astype(np.int64)
+        self.ivf = {'centroids': centroids, 'order': order, 'offsets': offsets}
+
+    def metadata_column(self, field):
+        # Cached per-field value arrays so filters are a vectorised comparison
+        column = self.metadata_columns.get(field)
+        if column is None:
+            column = np.empty(len(self.metadata), dtype=object)
+            column[:] = [metadata.get(field) for metadata in self.metadata]
+            self.metadata_columns[field] = column
+        return column
+
+    def filter_mask(self, where):
+        if not where:
+            return None
+        mask = np.ones(len(self.ids), dtype=bool)
+        for field, value in where.items():
+            mask &= self.metadata_column(field) == value
+        return mask
+
+    def search(self, query, k=10, nprobe=None, where=None, exclude=()):
+        # Returns [(id, score, metadata)] by cosine similarity; nprobe=None searches exactly
+        if len(self.ids) == 0:
+            return []
+        query = normalize_rows(np.asarray(query, dtype=np.float32).reshape(1, -1))[0]
+
+        if nprobe is not None and self.ivf is not None:
+            centroid_scores = self.ivf['centroids'] @ query
+            probed = top_k(centroid_scores, nprobe)
+            offsets = self.ivf['offsets']
+            candidates = np.concatenate([self.ivf['order'][offsets[list_number]:offsets[list_number + 1]]
+                                         for list_number in probed])
+        else:
+            candidates = np.arange(len(self.ids))
+
+        mask = self.filter_mask(where)
+        if mask is not None:
+            candidates = candidates[mask[candidates]]
+        if exclude:
+            excluded = np.array([self.row_of_id[row_id] for row_id in exclude if row_id in self.row_of_id], dtype=np.int64)
+            candidates = candidates[~np.isin(candidates, excluded)]
+
+        scores = np.asarray(self.vectors[candidates]) @ query
+        best = top_k(scores, k)
+        return [(self.ids[candidates[position]], float(scores[position]), self.metadata[candidates[position]])
+                for position in best]
+
+    def vector(self, row_id):
+        return np.asarray(self.vectors[self.row_of_id[row_id]])
+
+
+def standardize(features):
+    # z-score each column so no single stat dominates cosine similarity
+    features = np.asarray(features, dtype=np.float64)
+    mean = features.mean(axis=0) if len(features) else 0
+    std = features.std(axis=0) if len(features) else 1
+    std = np.where(std == 0, 1, std)
+    return (features - mean) / std
+
+
+def player_profile_rows(partial, catalog, min_rounds=0):
+    ids, features, metadata = [], [], []
+    for (player_id,), group in partial.rollup(('player',)).items():
+        stats = derived_metrics(group['counters'], group['agents'], group['maps'])
+        if stats['rounds'] < max(min_rounds, 1):
+            continue
+        rounds = stats['rounds']
+        stats['assists_per_round'] = stats['assists'] / rounds
+        stats['ability_uses_per_round'] = stats['ability_uses'] / rounds
+        stats['first_deaths_per_round'] = stats['first_deaths'] / rounds
+        player = catalog.player(player_id) or {}
+        ids.append(player_id)
+        features.append([stats[feature] for feature in PLAYER_FEATURES])
+        metadata.append({'handle': player.get('handle', player_id),
+                         'team': catalog.team_name(player.get('home_team_id')),
+                         'rounds': rounds})
+    return ids, features, metadata
+
+
+def match_rows(year, event):
+    # One vector per game from its cached per-game partial (built by playerAggregates)
+    partials_dir = f"{event}/aggregates/{year}"
+    ids, features, metadata = [], [], []
+    for partial_file in sorted(os.listdir(partials_dir)):
+        if not partial_file.endswith(".json"):
+            continue
+        with open(os.path.join(partials_dir, partial_file), "r") as cached_file:
+            partial = PlayerPartial.from_json(jsonBackend.load(cached_file)['rows'])
+        if not partial.counters:
+            continue
+        stats = dict(zip(COUNTER_FIELDS, partial.rollup(())[()]['counters']))
+        # Every player contributes the game's rounds once, so divide them back out
+        player_rounds = stats['rounds'] or 1
+        rounds = player_rounds / (stats['games'] or 1) or 1
+        ids.append(os.path.splitext(partial_file)[0])
+        features.append([rounds, stats['kills'] / rounds, stats['damage'] / rounds, stats['first_bloods'] / rounds,
+                         stats['clutch_attempts'] / rounds, stats['ability_uses'] / rounds,
+                         100 * stats['kast_rounds'] / player_rounds])
+        first_key = next(iter(partial.counters))
+        metadata.append({'map': first_key[KEY_FIELDS.index('map')],
+                         'tournament': first_key[KEY_FIELDS.index('tournament')]})
+    return ids, features, metadata
+
+
+def index_dir(event, year, name):
+    return f"{event}/vectors/{year}/{name}"
+
+
+def build_indexes(year, event, workers=1, min_rounds=0):
+    partial = season_partial(year, event, workers)
+    catalog = playerAggregates.catalog
+
+    built = {}
+    for name, (ids, features, metadata) in (('players', player_profile_rows(partial, catalog, min_rounds)),
+                                             ('matches', match_rows(year, event))):
+        index = VectorIndex(index_dir(event, year, name))
+        if ids:
+            index.upsert(ids, standardize(features), metadata)
+            index.build_ivf()
+        index.save()
+        built[name] = len(ids)
+    return built
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build and query local vector indexes of player and match stats.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help="Build the players and matches indexes for a league-year.")
+    build_parser.add_argument('year')
+    build_parser.add_argument('event')
+    build_parser.add_argument('--workers', type=int, default=1)
+    build_parser.add_argument('--min-rounds', type=int, default=0)
+
+    similar_parser = subparsers.add_parser('similar', help="Find players whose profile is most like a given player.")
+    similar_parser.add_argument('year')
+    similar_parser.add_argument('event')
+    similar_parser.add_argument('handle')
+    similar_parser.add_argument('--team', help="Only return players on this team (e.g. Sentinels).")
+    similar_parser.add_argument('--k', type=int, default=10)
+    similar_parser.add_argument('--nprobe', type=int, help="Approximate search over this many lists (default: exact).")
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        for name, rows in build_indexes(args.year, args.event, args.workers, args.min_rounds).items():
+            print(f"{name}: {rows} vectors in {index_dir(args.event, args.year, name)}")
+    else:
+        index = VectorIndex(index_dir(args.event, args.year, 'players'))
+        matches = [row_id for row_id, metadata in zip(index.ids, index.metadata) if metadata.get('handle') == args.handle]
+        if not matches:
+            raise SystemExit(f"No player with handle {args.handle} in the index")
+        where = {'team': args.team} if args.team else None
+        for row_id, score, metadata in index.search(index.vector(matches[0]), args.k, args.nprobe, where, exclude=matches):
+            print(f"{metadata['handle']} ({metadata['team']}): {score:.3f}")
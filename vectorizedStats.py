@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+from columnarStore import MISSING
+
+# Per-game player stats computed with grouped array operations over a
+# ColumnarGame, producing the same table the event-by-event collectors in
+# statCollectors build (kills, deaths, assists, damage, ability uses,
+# first bloods/deaths, agent, agent type, tier).
+
+STAT_COLUMNS = ['playerId', 'kills', 'deaths', 'assists', 'damage', 'ability_uses',
+                'first_bloods', 'first_deaths', 'agent', 'agent_type', 'tier']
+
+
+def count_by_player(codes, player_count):
+    codes = np.asarray(codes)
+    return np.bincount(codes[codes != MISSING], minlength=player_count).astype(np.int64)
+
+
+def touched_by(codes, player_count):
+    touched = np.zeros(player_count, dtype=bool)
+    codes = np.asarray(codes)
+    touched[codes[codes != MISSING]] = True
+    return touched
+
+
+def first_kills_per_round(game):
+    # Index of the first kill after each roundStarted, as FirstBloodCollector counts them
+    kill_sequence = np.asarray(game.column('kills', 'sequence'))
+    round_sequence = np.asarray(game.column('rounds', 'sequence'))
+    # Number of roundStarted events before each kill; 0 means no round has started yet
+    segment = np.searchsorted(round_sequence, kill_sequence)
+    in_round = np.flatnonzero(segment > 0)
+    _, first = np.unique(segment[in_round], return_index=True)
+    return in_round[first]
+
+
+def damage_by_player(causers, amounts, player_count):
+    valid = causers != MISSING
+    if amounts.dtype.kind == 'i':
+        totals = np.bincount(causers[valid], weights=amounts[valid], minlength=player_count)
+        return np.rint(totals).astype(np.int64)
+    # Float amounts: np.add.at adds in event order, so totals round exactly like the Python loop
+    totals = np.zeros(player_count, dtype=np.float64)
+    np.add.at(totals, causers[valid], amounts[valid])
+    return totals
+
+
+def compute_player_stats(game, agent_mapping, get_agent_type, tier='VCT International'):
+    player_ids = np.asarray(game.player_ids)
+    player_count = len(player_ids)
+
+    killers = np.asarray(game.column('kills', 'killer'))
+    victims = np.asarray(game.column('kills', 'victim'))
+    assistants = np.asarray(game.column('assists', 'assistant'))
+    causers = np.asarray(game.column('damage', 'causer'))
+    amounts = np.asarray(game.column('damage', 'amount'))
+    ability_players = np.asarray(game.column('abilities', 'player'))
+    configured_players = np.asarray(game.column('configuration', 'player'))
+    agent_guids = np.asarray(game.column('configuration', 'agent_guid'))
+
+    first_kills = first_kills_per_round(game)
+
+    # Agents: later configuration events overwrite earlier ones, as in AgentCollector
+    agents = ['Unknown'] * player_count
+    configured = (configured_players != MISSING) & (agent_guids != '')
+    for code, guid in zip(configured_players[configured].tolist(), agent_guids[configured].tolist()):
+        agents[code] = agent_mapping.get(guid.lower(), 'Unknown')
+    agent_types = [get_agent_type(agent) for agent in agents]
+
+    # Only players the collectors would have touched get a row
+    touched = (touched_by(killers, player_count) | touched_by(victims, player_count)
+               | touched_by(assistants, player_count) | touched_by(causers, player_count)
+               | touched_by(ability_players, player_count) | touched_by(configured_players[configured], player_count))
+    rows = np.flatnonzero(touched)
+
+    stats = pd.DataFrame({
+        'playerId': [str(player_id) for player_id in player_ids[rows].tolist()],
+        'kills': count_by_player(killers, player_count)[rows],
+        'deaths': count_by_player(victims, player_count)[rows],
+        'assists': count_by_player(assistants, player_count)[rows],
+        'damage': damage_by_player(causers, amounts, player_count)[rows],
+        'ability_uses': count_by_player(ability_players, player_count)[rows],
+        'first_bloods': count_by_player(killers[first_kills], player_count)[rows],
+        'first_deaths': count_by_player(victims[first_kills], player_count)[rows],
+        'agent': [agents[code] for code in rows.tolist()],
+        'agent_type': [agent_types[code] for code in rows.tolist()],
+        'tier': tier,
+    }, columns=STAT_COLUMNS)
+    return stats